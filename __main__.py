@@ -0,0 +1,5 @@
+import sys
+
+from projet_csp.cli import main
+
+sys.exit(main())
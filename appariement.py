@@ -0,0 +1,87 @@
+from collections import deque
+from typing import Dict, Hashable, List
+
+
+def hopcroft_karp(candidats: Dict[Hashable, List[Hashable]]) -> Dict:
+    """Couplage maximum d'un graphe biparti (algorithme de Hopcroft-Karp)
+
+    `candidats` associe à chaque sommet de gauche (ex: un examen) la liste
+    des sommets de droite admissibles (ex: enseignants). Renvoie le couplage
+    {gauche: droite}; il est parfait si sa taille vaut len(candidats).
+    """
+    couple_gauche = {u: None for u in candidats}
+    couple_droite = {}
+    infini = float("inf")
+
+    def augmenter(u):
+        for v in candidats[u]:
+            w = couple_droite.get(v)
+            if w is None or (distance.get(w) == distance[u] + 1 and augmenter(w)):
+                couple_gauche[u] = v
+                couple_droite[v] = u
+                return True
+        distance[u] = infini
+        return False
+
+    while True:
+        # Parcours en largeur: couches alternées depuis les sommets libres
+        distance = {}
+        file = deque()
+        for u, v in couple_gauche.items():
+            if v is None:
+                distance[u] = 0
+                file.append(u)
+
+        chemin_trouve = False
+        while file:
+            u = file.popleft()
+            for v in candidats[u]:
+                w = couple_droite.get(v)
+                if w is None:
+                    chemin_trouve = True
+                elif w not in distance:
+                    distance[w] = distance[u] + 1
+                    file.append(w)
+
+        if not chemin_trouve:
+            break
+
+        # Parcours en profondeur: chemins augmentants disjoints de longueur minimale
+        for u in candidats:
+            if couple_gauche[u] is None:
+                augmenter(u)
+
+    return {u: v for u, v in couple_gauche.items() if v is not None}
+
+
+def meilleur_ajustement(candidats: Dict[Hashable, List[Hashable]]) -> Dict:
+    """Couplage glouton au meilleur ajustement, avec repli sur Hopcroft-Karp
+
+    Les sommets de gauche sont traités dans l'ordre du dictionnaire et
+    prennent leur premier candidat libre: avec des candidats triés par
+    capacité croissante, chaque examen reçoit la plus petite salle libre
+    assez grande. Si le glouton laisse un sommet sans partenaire, le
+    couplage maximum est calculé par `hopcroft_karp`.
+    """
+    couplage = {}
+    pris = set()
+    for u, vs in candidats.items():
+        for v in vs:
+            if v not in pris:
+                couplage[u] = v
+                pris.add(v)
+                break
+        else:
+            return hopcroft_karp(candidats)
+    return couplage
+
+
+def en_premier(candidats: List[Hashable], prefere: Hashable) -> List[Hashable]:
+    """`candidats` avec `prefere` en tête, s'il y figure
+
+    Les deux couplages essaient les candidats dans l'ordre: le candidat
+    préféré est retenu dès qu'il est libre.
+    """
+    if prefere not in candidats or candidats[0] == prefere:
+        return candidats
+    return [prefere] + [c for c in candidats if c != prefere]
@@ -0,0 +1,359 @@
+"""Banc d'essai des moteurs de résolution
+
+    python -m projet_csp.benchmark [--tailles 100 200 400] [--moteurs recuit retour_arriere]
+                                   [--temps-limite 10] [--graine 0] [--sortie mesures.json]
+    python -m projet_csp.benchmark --itc exam_comp_set1.exam
+    python -m projet_csp.benchmark --toronto car-f-92.crs car-f-92.stu --creneaux 32
+
+Pour chaque instance (générée, ITC 2007 ou Toronto) et chaque moteur:
+temps de construction du modèle, temps de résolution, pic mémoire (Python,
+par tracemalloc) et qualité de la solution (violations, coût des
+préférences). Sur une série de tailles, l'exposant de croissance de chaque
+temps est estimé par moindres carrés en échelle log-log.
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import math
+import os
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, fields
+from datetime import time as heure
+from typing import Dict, List
+
+from projet_csp.chargement import DonneesSession
+from projet_csp.cli import ERREUR, MODES, resoudre
+from projet_csp.objectif import ObjectifSouple
+from projet_csp.planification import ExamenCSP, PlanificateurCSP, SalleCSP
+
+TOUJOURS = [(0, 10 ** 6)]  # disponibilité d'une salle ouverte pendant toute la session
+
+
+@dataclass
+class Instance:
+    """Données d'une session et ses créneaux"""
+    nom: str
+    donnees: DonneesSession
+    creneaux: List[tuple]
+
+
+@dataclass
+class Mesure:
+    """Résultat d'un moteur sur une instance; durées en secondes, mémoire en Mo"""
+    instance: str
+    moteur: str
+    examens: int
+    inscriptions: int
+    construction: float
+    resolution: float
+    memoire_pic: float
+    statut: str
+    violations: int
+    cout: int
+
+
+def generer_instance(nb_examens: int, graine: int = 0, examens_par_etudiant: int = 4,
+                     etudiants_par_examen: int = 10, tension_salles: float = 0.7,
+                     enseignants_par_examen: int = 2, profondeur_prerequis: int = 0,
+                     jours: int = 5) -> Instance:
+    """Instance synthétique reproductible (même graine, même instance)
+
+    - densité du graphe de conflits: chaque étudiant passe
+      `examens_par_etudiant` examens, choisis avec une popularité inégale;
+      il y a `etudiants_par_examen` étudiants par examen en moyenne;
+    - `tension_salles`: rapport entre le nombre d'examens et le nombre de
+      couples (salle, créneau); les capacités suivent la répartition des
+      effectifs, de sorte que le plus grand examen trouve une salle;
+    - un tiers d'enseignants par examen, `enseignants_par_examen` possibles
+      pour chacun;
+    - `profondeur_prerequis`: longueur des chaînes de prérequis (une chaîne
+      pour 20 examens), sans cycle.
+    """
+    hasard = random.Random(graine)
+    creneaux = PlanificateurCSP().creer_creneaux(heure(8), heure(18), 2, jours)
+    noms = [f"E{i}" for i in range(nb_examens)]
+    popularite = [hasard.paretovariate(1.5) for _ in noms]
+
+    nb_enseignants = max(enseignants_par_examen, nb_examens // 3)
+    enseignants = [f"T{i}" for i in range(nb_enseignants)]
+    examens = [ExamenCSP(nom, 2, hasard.sample(enseignants, enseignants_par_examen), []) for nom in noms]
+
+    index_etudiants = {}
+    nb_etudiants = nb_examens * etudiants_par_examen // examens_par_etudiant
+    for i in range(nb_etudiants):
+        choisis = set(hasard.choices(range(nb_examens), weights=popularite, k=examens_par_etudiant))
+        etudiant = f"S{i}"
+        index_etudiants[etudiant] = [noms[e] for e in sorted(choisis)]
+        for e in choisis:
+            examens[e].etudiants.append(etudiant)
+
+    nb_salles = max(1, math.ceil(nb_examens / (tension_salles * len(creneaux))))
+    effectifs = sorted((len(examen.etudiants) for examen in examens), reverse=True)
+    salles = []
+    for s in range(nb_salles):
+        effectif = effectifs[s * len(effectifs) // nb_salles]
+        salles.append(SalleCSP(f"R{s}", max(10, math.ceil(effectif / 10) * 10), list(TOUJOURS)))
+
+    prerequis = []
+    if profondeur_prerequis > 0:
+        for _ in range(max(1, nb_examens // 20)):
+            chaine = sorted(hasard.sample(range(nb_examens), min(profondeur_prerequis + 1, nb_examens)))
+            prerequis += [(noms[a], noms[b]) for a, b in zip(chaine, chaine[1:])]
+
+    nom = f"synthetique-{nb_examens}-g{graine}"
+    return Instance(nom, DonneesSession(examens, salles, list(dict.fromkeys(prerequis)), index_etudiants),
+                    creneaux)
+
+
+def _sections(chemin: str) -> Dict[str, List[List[str]]]:
+    """Sections "[Nom:n]" d'un fichier ITC 2007, lignes découpées aux virgules"""
+    sections, courante = {}, None
+    with open(chemin, encoding="utf-8") as f:
+        for ligne in f:
+            ligne = ligne.strip()
+            if not ligne:
+                continue
+            if ligne.startswith("["):
+                courante = sections.setdefault(ligne.strip("[]").split(":")[0], [])
+            elif courante is not None:
+                courante.append([champ.strip() for champ in ligne.split(",")])
+    return sections
+
+
+def charger_itc2007(chemin: str) -> Instance:
+    """Instance de la piste examens d'ITC 2007 (fichier .exam)
+
+    Les durées sont en minutes, comme les créneaux (jour, début, fin) tirés
+    des périodes. ITC 2007 n'a pas de surveillants: chaque examen a le sien.
+    Seules les contraintes AFTER deviennent des prérequis; EXAM_COINCIDENCE,
+    EXCLUSION et ROOM_EXCLUSIVE sont ignorées. Ici une salle n'accueille
+    qu'un examen par créneau, alors qu'ITC 2007 permet d'en partager les
+    places: les instances sont donc plus contraintes que l'original.
+    """
+    sections = _sections(chemin)
+
+    examens, index_etudiants = [], {}
+    for i, (duree, *etudiants) in enumerate(sections.get("Exams", [])):
+        nom = f"E{i}"
+        etudiants = list(dict.fromkeys(e for e in etudiants if e))
+        examens.append(ExamenCSP(nom, int(duree), [f"T{i}"], etudiants))
+        for etudiant in etudiants:
+            index_etudiants.setdefault(etudiant, []).append(nom)
+
+    periodes = sections.get("Periods", [])
+    jours = sorted({tuple(reversed(date.split(":"))) for date, *_ in periodes})
+    creneaux = []
+    for date, debut, duree, *_ in periodes:
+        heures, minutes, _ = (int(x) for x in debut.split(":"))
+        jour = jours.index(tuple(reversed(date.split(":"))))
+        creneaux.append((jour, heures * 60 + minutes, heures * 60 + minutes + int(duree)))
+
+    salles = [SalleCSP(f"R{i}", int(capacite), list(TOUJOURS))
+              for i, (capacite, *_) in enumerate(sections.get("Rooms", []))]
+
+    prerequis = []
+    for contrainte in sections.get("PeriodHardConstraints", []):
+        if len(contrainte) == 3 and contrainte[1] == "AFTER":
+            # "e1, AFTER, e2": e1 après e2
+            prerequis.append((f"E{int(contrainte[2])}", f"E{int(contrainte[0])}"))
+
+    nom = os.path.splitext(os.path.basename(chemin))[0]
+    return Instance(nom, DonneesSession(examens, salles, prerequis, index_etudiants), creneaux)
+
+
+def charger_toronto(chemin_crs: str, chemin_stu: str, nb_creneaux: int) -> Instance:
+    """Instance de Toronto (Carter et al.): fichier .crs (examen, effectif) et
+    .stu (une ligne d'examens par étudiant)
+
+    Les instances de Toronto n'ont ni salles ni surveillants: chaque examen a
+    son surveillant, et il y a autant de salles que d'examens, assez grandes
+    pour tous. Chacun des `nb_creneaux` créneaux forme une journée.
+    """
+    examens = {}
+    with open(chemin_crs, encoding="utf-8") as f:
+        for ligne in f:
+            champs = ligne.split()
+            if champs:
+                nom = sys.intern(champs[0])
+                examens[nom] = ExamenCSP(nom, 1, [f"T{len(examens)}"], [])
+
+    index_etudiants = {}
+    with open(chemin_stu, encoding="utf-8") as f:
+        for i, ligne in enumerate(f):
+            choisis = [nom for nom in dict.fromkeys(ligne.split()) if nom in examens]
+            if not choisis:
+                continue
+            etudiant = f"S{i}"
+            index_etudiants[etudiant] = choisis
+            for nom in choisis:
+                examens[nom].etudiants.append(etudiant)
+
+    plus_grand = max((len(examen.etudiants) for examen in examens.values()), default=0)
+    salles = [SalleCSP(f"R{i}", max(plus_grand, 1), list(TOUJOURS)) for i in range(len(examens))]
+    creneaux = [(c, 0, 1) for c in range(nb_creneaux)]
+    nom = os.path.splitext(os.path.basename(chemin_crs))[0]
+    return Instance(nom, DonneesSession(list(examens.values()), salles, [], index_etudiants), creneaux)
+
+
+def mesurer(instance: Instance, moteur: str, temps_limite: float = 10.0, graine: int = 0,
+            workers: int = None, memoire: bool = True) -> Mesure:
+    """Construit le modèle et le résout avec un moteur (voir `cli.MODES`)
+
+    Le pic mémoire ne couvre que ce processus (pas les processus du
+    portefeuille ni des composantes); tracemalloc ralentit la construction
+    et la résolution, `memoire=False` le désactive pour des temps exacts.
+    """
+    donnees = instance.donnees
+    if memoire:
+        tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            debut = time.perf_counter()
+            planificateur = PlanificateurCSP()
+            planificateur.preparer_domaines(donnees.examens, donnees.salles, instance.creneaux)
+            planificateur.ajouter_contraintes(donnees.examens, donnees.prerequis, donnees.index_etudiants)
+            construction = time.perf_counter() - debut
+
+            debut = time.perf_counter()
+            if planificateur.diagnostiquer():
+                solution, violations, infaisable = None, None, True
+            else:
+                arguments = argparse.Namespace(mode=moteur, temps_limite=temps_limite,
+                                               graine=graine, workers=workers)
+                solution, violations, infaisable = resoudre(planificateur, arguments)
+            resolution = time.perf_counter() - debut
+        pic = tracemalloc.get_traced_memory()[1] / 2 ** 20 if memoire else 0.0
+    finally:
+        if memoire:
+            tracemalloc.stop()
+
+    non_planifiables = len(donnees.examens) - len(planificateur.variables)
+    if infaisable:
+        statut = "infaisable"
+    elif solution is None or violations or non_planifiables:
+        statut = "non_resolu"
+    else:
+        statut = "faisable"
+    cout = ObjectifSouple(planificateur).evaluer_solution(planificateur, solution) if solution else None
+    return Mesure(instance.nom, moteur, len(donnees.examens),
+                  sum(len(examen.etudiants) for examen in donnees.examens),
+                  round(construction, 4), round(resolution, 4), round(pic, 2),
+                  statut, violations, cout)
+
+
+def exposant(tailles: List[float], durees: List[float]) -> float:
+    """Pente de log(durée) en fonction de log(taille), par moindres carrés:
+    la durée croît environ comme taille ** pente"""
+    points = [(math.log(t), math.log(d)) for t, d in zip(tailles, durees) if t > 0 and d > 0]
+    if len(points) < 2:
+        return None
+    moyenne_x = sum(x for x, _ in points) / len(points)
+    moyenne_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - moyenne_x) ** 2 for x, _ in points)
+    if variance == 0:
+        return None
+    return sum((x - moyenne_x) * (y - moyenne_y) for x, y in points) / variance
+
+
+def afficher_mesures(mesures: List[Mesure]):
+    print(f"{'instance':<28}{'moteur':<16}{'examens':>8}{'constr.(s)':>12}{'résol.(s)':>11}"
+          f"{'mém.(Mo)':>10}  {'statut':<12}{'viol.':>7}{'coût':>9}")
+    for m in mesures:
+        violations = "-" if m.violations is None else m.violations
+        cout = "-" if m.cout is None else m.cout
+        print(f"{m.instance:<28}{m.moteur:<16}{m.examens:>8}{m.construction:>12.3f}{m.resolution:>11.3f}"
+              f"{m.memoire_pic:>10.1f}  {m.statut:<12}{violations:>7}{cout:>9}")
+
+
+def afficher_echelle(mesures: List[Mesure]):
+    """Exposant de croissance des temps de chaque moteur avec le nombre d'examens"""
+    for moteur in dict.fromkeys(m.moteur for m in mesures):
+        serie = [m for m in mesures if m.moteur == moteur]
+        tailles = [m.examens for m in serie]
+        if len(set(tailles)) < 2:
+            continue
+        pentes = [exposant(tailles, [getattr(m, nom) for m in serie]) for nom in ("construction", "resolution")]
+        texte = ["?" if p is None else f"n^{p:.2f}" for p in pentes]
+        print(f"{moteur}: construction ~ {texte[0]}, résolution ~ {texte[1]}")
+
+
+def ecrire_mesures(mesures: List[Mesure], chemin: str):
+    if chemin.endswith(".csv"):
+        with open(chemin, "w", newline="", encoding="utf-8") as f:
+            ecrivain = csv.DictWriter(f, fieldnames=[champ.name for champ in fields(Mesure)])
+            ecrivain.writeheader()
+            ecrivain.writerows(asdict(m) for m in mesures)
+    else:
+        with open(chemin, "w", encoding="utf-8") as f:
+            json.dump([asdict(m) for m in mesures], f, ensure_ascii=False, indent=2)
+            f.write("\n")
+
+
+def creer_parseur() -> argparse.ArgumentParser:
+    parseur = argparse.ArgumentParser(prog="python -m projet_csp.benchmark",
+                                      description="Banc d'essai des moteurs de résolution")
+    parseur.add_argument("--tailles", type=int, nargs="+", default=[50, 100, 200],
+                         help="nombres d'examens des instances générées")
+    parseur.add_argument("--graine", type=int, default=0)
+    parseur.add_argument("--examens-par-etudiant", type=int, default=4, help="densité des conflits")
+    parseur.add_argument("--tension-salles", type=float, default=0.7,
+                         help="examens / couples (salle, créneau)")
+    parseur.add_argument("--profondeur-prerequis", type=int, default=0)
+    parseur.add_argument("--jours", type=int, default=5)
+    parseur.add_argument("--itc", nargs="+", default=[], help="fichiers .exam d'ITC 2007")
+    parseur.add_argument("--toronto", nargs=2, action="append", default=[], metavar=("CRS", "STU"),
+                         help="fichiers .crs et .stu d'une instance de Toronto")
+    parseur.add_argument("--creneaux", type=int, default=None,
+                         help="nombre de créneaux des instances de Toronto")
+    parseur.add_argument("--moteurs", nargs="+", choices=MODES, default=["retour_arriere", "recuit"])
+    parseur.add_argument("--temps-limite", type=float, default=10.0, help="par moteur et instance")
+    parseur.add_argument("--workers", type=int, default=None)
+    parseur.add_argument("--sans-memoire", action="store_true",
+                         help="ne pas suivre la mémoire (temps sans le surcoût de tracemalloc)")
+    parseur.add_argument("--sortie", help="fichier .json ou .csv des mesures")
+    return parseur
+
+
+def main(argv=None) -> int:
+    arguments = creer_parseur().parse_args(argv)
+    if arguments.toronto and arguments.creneaux is None:
+        print("--creneaux est nécessaire avec --toronto", file=sys.stderr)
+        return ERREUR
+
+    try:
+        instances = [charger_itc2007(chemin) for chemin in arguments.itc]
+        instances += [charger_toronto(crs, stu, arguments.creneaux) for crs, stu in arguments.toronto]
+    except (OSError, ValueError) as e:
+        print(f"Erreur de chargement: {e}", file=sys.stderr)
+        return ERREUR
+    generees = not instances
+    if generees:
+        instances = [generer_instance(taille, arguments.graine, arguments.examens_par_etudiant,
+                                      tension_salles=arguments.tension_salles,
+                                      profondeur_prerequis=arguments.profondeur_prerequis,
+                                      jours=arguments.jours)
+                     for taille in arguments.tailles]
+
+    mesures = []
+    for instance in instances:
+        for moteur in arguments.moteurs:
+            mesure = mesurer(instance, moteur, arguments.temps_limite, arguments.graine,
+                             arguments.workers, not arguments.sans_memoire)
+            print(f"{instance.nom} / {moteur}: {mesure.statut} en {mesure.resolution:.2f}s", file=sys.stderr)
+            mesures.append(mesure)
+
+    afficher_mesures(mesures)
+    if generees:
+        afficher_echelle(mesures)
+    if arguments.sortie:
+        ecrire_mesures(mesures, arguments.sortie)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
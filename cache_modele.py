@@ -0,0 +1,125 @@
+import hashlib
+import os
+import pickle
+import tempfile
+from collections import OrderedDict
+from typing import Dict, List
+
+from projet_csp.planification import ExamenCSP, PlanificateurCSP, SalleCSP
+
+VERSION = 4  # à incrémenter quand la forme du modèle compilé change
+
+# Attributs du planificateur qui forment le modèle compilé
+ATTRIBUTS = (
+    "variables", "domains", "graphe", "creneaux", "bornes_creneaux",
+    "noms_salles", "capacites_salles", "salles_par_creneau",
+    "noms_enseignants", "codes_enseignants", "enseignants_eligibles",
+    "salles_eligibles", "prerequis", "dag_prerequis", "chaines_impossibles",
+    "reductions", "domaine_vide", "sans_domaine",
+)
+
+
+def empreinte(examens: List[ExamenCSP], salles: List[SalleCSP],
+              creneaux: List[tuple], prerequis: List[tuple] = None) -> str:
+    """Empreinte SHA-256 du contenu des données d'entrée
+
+    L'ordre compte (il fixe les codes des salles et des enseignants): deux
+    jeux de données identiques dans le même ordre ont la même empreinte.
+    """
+    h = hashlib.sha256(f"modele-v{VERSION}".encode())
+
+    def ajouter(*champs):
+        h.update("\x1f".join(str(c) for c in champs).encode())
+        h.update(b"\x1e")
+
+    for examen in examens:
+        ajouter("examen", examen.nom, examen.duree)
+        ajouter(*examen.enseignants)
+        ajouter(*examen.etudiants)
+    for salle in salles:
+        ajouter("salle", salle.nom, salle.capacite, *salle.disponibilites)
+    ajouter("creneaux", *creneaux)
+    ajouter("prerequis", *(prerequis or []))
+    return h.hexdigest()
+
+
+class CacheModeles:
+    """Cache des modèles compilés (domaines, graphe de conflits, prérequis)
+
+    Deux niveaux: les `capacite` derniers modèles en mémoire (LRU), et, si
+    `dossier` est donné, un fichier pickle par modèle, retrouvé d'une
+    exécution à l'autre. Seul le problème python-constraint, peu coûteux,
+    est reconstruit à chaque appel: chaque planificateur renvoyé peut donc
+    être résolu indépendamment des autres.
+    """
+
+    def __init__(self, capacite: int = 8, dossier: str = None):
+        self.capacite = capacite
+        self.dossier = dossier
+        self.modeles: "OrderedDict[str, Dict]" = OrderedDict()
+        self.succes = 0
+        self.echecs = 0
+        if dossier is not None:
+            os.makedirs(dossier, exist_ok=True)
+
+    def planificateur(self, examens: List[ExamenCSP], salles: List[SalleCSP],
+                      creneaux: List[tuple], prerequis: List[tuple] = None,
+                      index_etudiants: Dict[str, List[str]] = None,
+                      instrumentation=None) -> PlanificateurCSP:
+        """Planificateur prêt à résoudre, équivalent à preparer_domaines puis
+        ajouter_contraintes sur ces données
+
+        `instrumentation` (voir Instrumentation) est donnée au planificateur:
+        elle mesure la compilation du modèle ou sa reconstruction depuis le cache.
+        """
+        cle = empreinte(examens, salles, creneaux, prerequis)
+        modele = self._lire(cle)
+        if modele is None:
+            self.echecs += 1
+            planificateur = PlanificateurCSP(instrumentation)
+            planificateur.preparer_domaines(examens, salles, creneaux)
+            planificateur.ajouter_contraintes(examens, prerequis, index_etudiants)
+            modele = {attribut: getattr(planificateur, attribut) for attribut in ATTRIBUTS}
+            self._ecrire(cle, modele)
+            return planificateur
+
+        self.succes += 1
+        planificateur = PlanificateurCSP(instrumentation)
+        for attribut, valeur in modele.items():
+            setattr(planificateur, attribut, valeur)
+        planificateur.construire_probleme()
+        return planificateur
+
+    def _chemin(self, cle: str) -> str:
+        return os.path.join(self.dossier, f"{cle}.pickle")
+
+    def _lire(self, cle: str):
+        modele = self.modeles.get(cle)
+        if modele is not None:
+            self.modeles.move_to_end(cle)
+            return modele
+        if self.dossier is None or not os.path.exists(self._chemin(cle)):
+            return None
+        try:
+            with open(self._chemin(cle), "rb") as f:
+                modele = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            return None  # fichier illisible: le modèle sera recompilé
+        self._memoriser(cle, modele)
+        return modele
+
+    def _ecrire(self, cle: str, modele: Dict):
+        self._memoriser(cle, modele)
+        if self.dossier is None:
+            return
+        # Écriture dans un fichier temporaire puis renommage: jamais de pickle tronqué
+        descripteur, temporaire = tempfile.mkstemp(dir=self.dossier, suffix=".tmp")
+        with os.fdopen(descripteur, "wb") as f:
+            pickle.dump(modele, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporaire, self._chemin(cle))
+
+    def _memoriser(self, cle: str, modele: Dict):
+        self.modeles[cle] = modele
+        self.modeles.move_to_end(cle)
+        while len(self.modeles) > self.capacite:
+            self.modeles.popitem(last=False)
@@ -0,0 +1,195 @@
+import csv
+import os
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Sequence
+
+from projet_csp.planification import ExamenCSP, SalleCSP
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet optionnel
+    pq = None
+
+TAILLE_LOT = 65536  # lignes lues à la fois dans un fichier Parquet
+
+
+@dataclass
+class DonneesSession:
+    """Données d'une session chargées depuis des fichiers"""
+    examens: List[ExamenCSP]
+    salles: List[SalleCSP]
+    prerequis: List[tuple] = field(default_factory=list)
+    index_etudiants: Dict[str, List[str]] = field(default_factory=dict)  # etudiant -> examens
+
+
+def lire_lignes(chemin: str, colonnes: Sequence[str], optionnelles: Sequence[str] = ()) -> Iterator[tuple]:
+    """Parcourt un fichier CSV (en-tête obligatoire) ou Parquet ligne par ligne
+
+    Produit, pour chaque ligne, le tuple des valeurs des `colonnes` puis des
+    `optionnelles` (None si la colonne est absente). Une cellule manquante
+    ou vide dans l'une des `colonnes` lève ValueError (fichier, ligne,
+    colonne). Le fichier n'est jamais chargé en entier: la mémoire reste
+    bornée quelle que soit sa taille.
+    """
+    def verifier(valeurs, numero):
+        for colonne, valeur in zip(colonnes, valeurs):
+            if valeur is None or valeur == "":
+                raise ValueError(f"{chemin}, ligne {numero}: valeur manquante dans la colonne {colonne}")
+        return valeurs
+
+    if chemin.endswith(".parquet"):
+        if pq is None:
+            raise ImportError(f"pyarrow est nécessaire pour lire {chemin}")
+        fichier = pq.ParquetFile(chemin)
+        presentes = set(fichier.schema_arrow.names)
+        manquantes = [c for c in colonnes if c not in presentes]
+        if manquantes:
+            raise ValueError(f"{chemin}: colonne(s) manquante(s): {', '.join(manquantes)}")
+        lues = list(colonnes) + [c for c in optionnelles if c in presentes]
+        numero = 0
+        for lot in fichier.iter_batches(batch_size=TAILLE_LOT, columns=lues):
+            valeurs = [[None if v is None else str(v) for v in lot.column(c).to_pylist()] for c in lues]
+            vides = [[None] * lot.num_rows] * (len(colonnes) + len(optionnelles) - len(lues))
+            for ligne in zip(*valeurs, *vides):
+                numero += 1
+                yield verifier(ligne, numero)
+        return
+
+    with open(chemin, newline="", encoding="utf-8-sig") as f:
+        lecteur = csv.reader(f)
+        entete = [nom.strip() for nom in next(lecteur, [])]
+        manquantes = [c for c in colonnes if c not in entete]
+        if manquantes:
+            raise ValueError(f"{chemin}: colonne(s) manquante(s): {', '.join(manquantes)}")
+        positions = [entete.index(c) for c in colonnes]
+        positions += [entete.index(c) if c in entete else None for c in optionnelles]
+        for ligne in lecteur:
+            if not ligne:
+                continue
+            # Numéro de la ligne dans le fichier, en-tête compris
+            yield verifier(tuple(ligne[p].strip() if p is not None and p < len(ligne) else None
+                                 for p in positions), lecteur.line_num)
+
+
+def entier(valeur: str) -> int:
+    """'2' ou '2.0' (colonnes numériques des exports Parquet/Arrow) -> 2"""
+    try:
+        return int(valeur)
+    except ValueError:
+        nombre = float(valeur)
+        if not nombre.is_integer():
+            raise ValueError(f"nombre entier attendu: {valeur!r}") from None
+        return int(nombre)
+
+
+def lire_disponibilites(texte: str) -> List[tuple]:
+    """'8-12|14-18' -> [(8, 12), (14, 18)]; 'jour:debut-fin' donne un triplet
+
+    Les jours sont numérotés à partir de 1, comme la colonne jour du
+    planning exporté; le triplet les numérote à partir de 0 (voir
+    `bornes_creneau`): '1:8-12' -> (0, 8, 12).
+    """
+    disponibilites = []
+    for morceau in texte.split("|"):
+        if not morceau.strip():
+            continue
+        jour, _, heures = morceau.rpartition(":")
+        debut, fin = (int(h) for h in heures.split("-"))
+        if jour and int(jour) < 1:
+            raise ValueError(f"disponibilité {morceau.strip()!r}: les jours sont numérotés à partir de 1")
+        disponibilites.append((int(jour) - 1, debut, fin) if jour else (debut, fin))
+    return disponibilites
+
+
+def charger_salles(chemin: str) -> List[SalleCSP]:
+    """Colonnes salle, capacite et, optionnellement, disponibilites (8h-18h par défaut)"""
+    salles = []
+    for nom, capacite, disponibilites in lire_lignes(chemin, ("salle", "capacite"), ("disponibilites",)):
+        salles.append(SalleCSP(nom, entier(capacite), lire_disponibilites(disponibilites or "") or [(8, 18)]))
+    return salles
+
+
+def charger_prerequis(chemin: str) -> List[tuple]:
+    """Colonnes avant, apres"""
+    return [(sys.intern(avant), sys.intern(apres)) for avant, apres in lire_lignes(chemin, ("avant", "apres"))]
+
+
+def charger_session(examens: str, inscriptions: str, salles: str,
+                    enseignants: str = None, prerequis: str = None) -> DonneesSession:
+    """Charge une session à partir d'exports de la scolarité
+
+    - `examens`: colonnes examen, duree et, optionnellement, enseignants
+      (séparés par '|');
+    - `inscriptions`: colonnes etudiant, examen, une ligne par inscription;
+    - `salles`: voir `charger_salles`;
+    - `enseignants` (optionnel): colonnes examen, enseignant;
+    - `prerequis` (optionnel): voir `charger_prerequis`.
+
+    Les inscriptions sont lues en un seul passage, qui remplit à la fois les
+    listes d'étudiants des examens et l'index étudiant -> examens utilisé
+    par le graphe de conflits. Les identifiants sont internés (une seule
+    chaîne par étudiant ou enseignant) et les inscriptions en double
+    ignorées. Un examen présent sur plusieurs lignes garde la durée de la
+    première; les enseignants de toutes ses lignes sont réunis.
+    """
+    par_nom = {}
+    doublons = 0
+    for nom, duree, noms_enseignants in lire_lignes(examens, ("examen", "duree"), ("enseignants",)):
+        nom = sys.intern(nom)
+        liste = [sys.intern(e) for e in (noms_enseignants or "").split("|") if e.strip()]
+        examen = par_nom.get(nom)
+        if examen is not None:
+            doublons += 1
+            examen.enseignants.extend(e for e in dict.fromkeys(liste) if e not in examen.enseignants)
+            continue
+        par_nom[nom] = ExamenCSP(nom, entier(duree), list(dict.fromkeys(liste)), [])
+    if doublons:
+        print(f"{doublons} ligne(s) d'examen en double: durée de la première ligne gardée, enseignants réunis")
+
+    if enseignants is not None:
+        for nom, enseignant in lire_lignes(enseignants, ("examen", "enseignant")):
+            examen = par_nom.get(nom)
+            if examen is not None and enseignant not in examen.enseignants:
+                examen.enseignants.append(sys.intern(enseignant))
+
+    index_etudiants = {}
+    ignorees = 0
+    for etudiant, nom in lire_lignes(inscriptions, ("etudiant", "examen")):
+        examen = par_nom.get(nom)
+        if examen is None:
+            ignorees += 1
+            continue
+        etudiant = sys.intern(etudiant)
+        examens_etudiant = index_etudiants.get(etudiant)
+        if examens_etudiant is None:
+            examens_etudiant = index_etudiants[etudiant] = []
+        elif examen.nom in examens_etudiant:
+            continue  # inscription en double
+        examens_etudiant.append(examen.nom)
+        examen.etudiants.append(etudiant)
+    if ignorees:
+        print(f"{ignorees} inscription(s) ignorée(s): examen inconnu")
+
+    return DonneesSession(
+        examens=list(par_nom.values()),
+        salles=charger_salles(salles),
+        prerequis=charger_prerequis(prerequis) if prerequis is not None else [],
+        index_etudiants=index_etudiants,
+    )
+
+
+def charger_dossier(dossier: str) -> DonneesSession:
+    """Charge examens, inscriptions, salles et, s'ils existent, enseignants et
+    prerequis depuis un dossier (fichiers .csv ou .parquet de ces noms)"""
+    def trouver(nom, obligatoire=True):
+        for extension in (".parquet", ".csv"):
+            chemin = os.path.join(dossier, nom + extension)
+            if os.path.exists(chemin):
+                return chemin
+        if obligatoire:
+            raise FileNotFoundError(f"{nom}.csv introuvable dans {dossier}")
+        return None
+
+    return charger_session(trouver("examens"), trouver("inscriptions"), trouver("salles"),
+                           trouver("enseignants", False), trouver("prerequis", False))
@@ -0,0 +1,218 @@
+"""Planification en ligne de commande, sans interface graphique
+
+    python -m projet_csp DOSSIER [--mode portefeuille] [--temps-limite 60]
+                         [--workers N] [--jours 1] [--sortie planning.json]
+    python -m projet_csp DOSSIER --valider planning.json
+
+Codes de sortie: 0 si le planning produit respecte toutes les contraintes,
+1 si aucun planning sans violation n'a été trouvé dans le temps imparti,
+2 en cas d'erreur sur les arguments ou les données, 3 si le problème est
+prouvé sans solution (le JSON donne alors le diagnostic: conditions
+nécessaires violées ou examens d'un noyau insatisfiable). Avec --valider,
+aucune résolution: le planning donné (.json ou .csv, comme --sortie) est
+vérifié, code 0 s'il est valide, 1 s'il a des violations.
+"""
+import argparse
+import contextlib
+import csv
+import json
+import sys
+import threading
+from datetime import time
+
+from projet_csp.cache_modele import CacheModeles
+from projet_csp.chargement import charger_dossier, charger_session
+from projet_csp.instrumentation import Instrumentation
+from projet_csp.planification import PlanificateurCSP
+from projet_csp.validation import valider_solution
+
+FAISABLE, NON_RESOLU, ERREUR, INFAISABLE = 0, 1, 2, 3
+
+MODES = ("portefeuille", "retour_arriere", "recuit", "composantes")
+CHAMPS = ("examen", "jour", "heure_debut", "heure_fin", "salle", "enseignant", "duree")
+
+
+def creer_parseur() -> argparse.ArgumentParser:
+    parseur = argparse.ArgumentParser(prog="python -m projet_csp",
+                                      description="Planificateur d'examens par CSP")
+    parseur.add_argument("dossier", nargs="?",
+                         help="dossier contenant examens, inscriptions, salles "
+                              "(et éventuellement enseignants, prerequis) en .csv ou .parquet")
+    parseur.add_argument("--examens", help="fichier des examens (remplace celui du dossier)")
+    parseur.add_argument("--inscriptions", help="fichier des inscriptions")
+    parseur.add_argument("--salles", help="fichier des salles")
+    parseur.add_argument("--enseignants", help="fichier examen -> enseignant")
+    parseur.add_argument("--prerequis", help="fichier des prérequis")
+    parseur.add_argument("--mode", choices=MODES, default="portefeuille",
+                         help="moteur de résolution (défaut: portefeuille)")
+    parseur.add_argument("--temps-limite", type=float, default=60.0, help="en secondes (défaut: 60)")
+    parseur.add_argument("--workers", type=int, default=None,
+                         help="nombre de processus (portefeuille, composantes)")
+    parseur.add_argument("--graine", type=int, default=None, help="graine du recuit")
+    parseur.add_argument("--jours", type=int, default=1, help="nombre de jours de la session")
+    parseur.add_argument("--debut", type=int, default=8, help="heure de début de journée")
+    parseur.add_argument("--fin", type=int, default=18, help="heure de fin de journée")
+    parseur.add_argument("--duree-creneau", type=int, default=2, help="durée d'un créneau en heures")
+    parseur.add_argument("--sortie", help="fichier .json ou .csv (défaut: JSON sur la sortie standard)")
+    parseur.add_argument("--cache", help="dossier du cache des modèles compilés, réutilisés "
+                                         "tant que les données ne changent pas")
+    parseur.add_argument("--instrumentation", help="mesures de la construction et de la résolution: "
+                                                   ".json, .speedscope.json ou .prof (cProfile)")
+    parseur.add_argument("--valider", metavar="PLANNING",
+                         help="vérifie un planning .json ou .csv au lieu d'en chercher un")
+    return parseur
+
+
+def ecrire_json(lignes, flux, statut: str, violations: int, diagnostic=()):
+    contenu = {"statut": statut, "violations": violations, "planning": lignes}
+    if diagnostic:
+        contenu["diagnostic"] = [{"nature": i.nature, "message": i.message, "examens": i.examens,
+                                  "contraintes": i.contraintes} for i in diagnostic]
+    json.dump(contenu, flux, ensure_ascii=False, indent=2)
+    flux.write("\n")
+
+
+def ecrire_csv(lignes, flux):
+    ecrivain = csv.DictWriter(flux, fieldnames=CHAMPS)
+    ecrivain.writeheader()
+    ecrivain.writerows(lignes)
+
+
+def lire_planning(chemin: str):
+    """Lignes d'un planning écrit par --sortie (JSON ou CSV); en CSV, les
+    champs vides valent None"""
+    with open(chemin, newline="", encoding="utf-8") as f:
+        if chemin.endswith(".csv"):
+            return [{champ: valeur if valeur != "" else None for champ, valeur in ligne.items()}
+                    for ligne in csv.DictReader(f)]
+        return json.load(f)["planning"]
+
+
+def valider(donnees, arguments) -> int:
+    """Vérifie le planning de `arguments.valider` et écrit les violations en JSON"""
+    try:
+        lignes = lire_planning(arguments.valider)
+        violations = valider_solution(lignes, donnees.examens, donnees.salles, donnees.prerequis,
+                                      donnees.index_etudiants)
+    except KeyError as e:
+        print(f"Erreur de lecture du planning: champ {e} manquant", file=sys.stderr)
+        return ERREUR
+    except (OSError, ValueError) as e:
+        print(f"Erreur de lecture du planning: {e}", file=sys.stderr)
+        return ERREUR
+    for violation in violations:
+        print(f"[{violation.nature}] {violation.detail}", file=sys.stderr)
+    statut = "invalide" if violations else "valide"
+    print(f"{statut}: {len(lignes)} ligne(s), {len(violations)} violation(s)", file=sys.stderr)
+
+    contenu = {"statut": statut, "violations": [{"nature": v.nature, "examens": list(v.examens),
+                                                 "detail": v.detail} for v in violations]}
+    if arguments.sortie is None:
+        json.dump(contenu, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+    else:
+        with open(arguments.sortie, "w", encoding="utf-8") as f:
+            json.dump(contenu, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+    return NON_RESOLU if violations else FAISABLE
+
+
+def resoudre(planificateur: PlanificateurCSP, arguments):
+    """Renvoie (solution, nb_violations, infaisable) selon le mode demandé"""
+    if arguments.mode == "retour_arriere":
+        arret = threading.Event()
+        minuterie = threading.Timer(arguments.temps_limite, arret.set)
+        minuterie.daemon = True
+        minuterie.start()
+        try:
+            solution = planificateur.resoudre(mode="first", ordre="dsatur",
+                                              depart=planificateur.coloration_initiale(), arret=arret)
+        finally:
+            minuterie.cancel()
+        if solution is None:
+            return None, None, not arret.is_set()
+        return solution, 0, False
+
+    if arguments.mode == "recuit":
+        solution, violations = planificateur.optimiser(arguments.temps_limite, arguments.graine)
+        return solution, violations, False
+
+    if arguments.mode == "composantes":
+        return planificateur.resoudre_par_composantes(arguments.temps_limite, arguments.workers)
+
+    resultat = planificateur.resoudre_portefeuille(arguments.temps_limite, arguments.workers)
+    return resultat.solution, resultat.violations, resultat.infaisable
+
+
+def main(argv=None) -> int:
+    arguments = creer_parseur().parse_args(argv)
+
+    # Les messages du planificateur vont sur la sortie d'erreur, pour ne pas
+    # mélanger le planning écrit sur la sortie standard
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            if arguments.dossier:
+                donnees = charger_dossier(arguments.dossier)
+            elif arguments.examens and arguments.inscriptions and arguments.salles:
+                donnees = charger_session(arguments.examens, arguments.inscriptions, arguments.salles,
+                                          arguments.enseignants, arguments.prerequis)
+            else:
+                print("Indiquer un dossier, ou --examens, --inscriptions et --salles")
+                return ERREUR
+        except (OSError, ValueError, TypeError, ImportError) as e:
+            print(f"Erreur de chargement: {e}")
+            return ERREUR
+
+    if arguments.valider:
+        return valider(donnees, arguments)
+
+    with contextlib.redirect_stdout(sys.stderr):
+        creneaux = PlanificateurCSP().creer_creneaux(time(arguments.debut), time(arguments.fin),
+                                                     arguments.duree_creneau, arguments.jours)
+        instrumentation = None
+        if arguments.instrumentation:
+            instrumentation = Instrumentation(profil=arguments.instrumentation.endswith((".prof", ".pstats")))
+        cache = CacheModeles(capacite=1, dossier=arguments.cache)
+        planificateur = cache.planificateur(donnees.examens, donnees.salles, creneaux,
+                                            donnees.prerequis, donnees.index_etudiants, instrumentation)
+        non_planifiables = len(donnees.examens) - len(planificateur.variables)
+
+        # Conditions nécessaires d'abord: inutile de chercher si elles échouent
+        diagnostic = planificateur.diagnostiquer()
+        if diagnostic:
+            solution, violations, infaisable = None, None, True
+        else:
+            solution, violations, infaisable = resoudre(planificateur, arguments)
+            if infaisable:
+                noyau = planificateur.noyau_insatisfiable(arguments.temps_limite)
+                diagnostic = [noyau] if noyau is not None else []
+        for incoherence in diagnostic:
+            print(incoherence.message)
+            for contrainte in incoherence.contraintes:
+                print(f"  - {contrainte}")
+
+        if infaisable:
+            statut, code = "infaisable", INFAISABLE
+        elif solution is None or violations or non_planifiables:
+            statut, code = "non_resolu", NON_RESOLU
+        else:
+            statut, code = "faisable", FAISABLE
+        print(f"{statut}: {len(solution or {})} examen(s) planifié(s), {violations or 0} violation(s), "
+              f"{non_planifiables} examen(s) sans créneau possible")
+
+    if instrumentation is not None:
+        instrumentation.exporter(arguments.instrumentation)
+    lignes = planificateur.lignes_solution(solution or {}, donnees.examens)
+    if arguments.sortie is None:
+        ecrire_json(lignes, sys.stdout, statut, violations, diagnostic)
+    elif arguments.sortie.endswith(".csv"):
+        with open(arguments.sortie, "w", newline="", encoding="utf-8") as f:
+            ecrire_csv(lignes, f)
+    else:
+        with open(arguments.sortie, "w", encoding="utf-8") as f:
+            ecrire_json(lignes, f, statut, violations, diagnostic)
+    return code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from typing import TYPE_CHECKING, List
+
+from projet_csp.portefeuille import ConfigurationSolveur, executer_configuration
+from projet_csp.recherche_locale import RechercheLocale
+
+if TYPE_CHECKING:
+    from projet_csp.planification import PlanificateurCSP
+
+
+def composantes_connexes(planificateur: "PlanificateurCSP") -> List[List[str]]:
+    """Groupes d'examens planifiables reliés par des étudiants, des
+    enseignants ou des prérequis communs, du plus grand au plus petit
+
+    Deux groupes distincts ne se disputent que les salles.
+    """
+    parent = {examen: examen for examen in planificateur.domains}
+
+    def racine(examen):
+        while parent[examen] != examen:
+            parent[examen] = parent[parent[examen]]
+            examen = parent[examen]
+        return examen
+
+    def unir(exam1, exam2):
+        r1, r2 = racine(exam1), racine(exam2)
+        if r1 != r2:
+            parent[r1] = r2
+
+    for examen in planificateur.domains:
+        for voisin in planificateur.graphe.voisins(examen):
+            if voisin in parent:
+                unir(examen, voisin)
+    premier_examen = {}  # enseignant -> premier examen qu'il peut surveiller
+    for examen, enseignants in planificateur.enseignants_eligibles.items():
+        for enseignant in enseignants:
+            unir(examen, premier_examen.setdefault(enseignant, examen))
+    for avant, apres in planificateur.prerequis:
+        unir(avant, apres)
+
+    groupes = {}
+    for examen in planificateur.variables:
+        groupes.setdefault(racine(examen), []).append(examen)
+    return sorted(groupes.values(), key=len, reverse=True)
+
+
+def _repartir(composantes: List[List[str]], nombre: int) -> List[List[int]]:
+    """Répartit les composantes (indices) en `nombre` lots de tailles proches"""
+    lots = [[] for _ in range(min(nombre, len(composantes)))]
+    tailles = [0] * len(lots)
+    for k, composante in enumerate(composantes):  # déjà triées par taille décroissante
+        lot = tailles.index(min(tailles))
+        lots[lot].append(k)
+        tailles[lot] += len(composante)
+    return lots
+
+
+def _resoudre_lot(sous_problemes: List["PlanificateurCSP"], configuration: ConfigurationSolveur,
+                  echeance: float, arret) -> List[tuple]:
+    """Résout les composantes d'un lot l'une après l'autre
+
+    Renvoie pour chacune (planning {examen: créneau}, résolue, infaisable);
+    une composante non résolue à temps garde sa coloration DSatur.
+    """
+    resultats = []
+    for sous in sous_problemes:
+        restant = echeance - time.time()
+        resultat = None
+        if restant > 0 and not arret.is_set():
+            resultat = executer_configuration(sous, configuration, restant, arret, None)
+        if resultat is not None and resultat.solution is not None:
+            planning = {e: sous.indice_creneau(code) for e, code in resultat.solution.items()}
+            resultats.append((planning, resultat.violations == 0, False))
+        else:
+            resultats.append((sous.coloration_initiale(), False, resultat is not None and resultat.infaisable))
+    return resultats
+
+
+def resoudre_par_composantes(planificateur: "PlanificateurCSP",
+                             configuration: ConfigurationSolveur = None,
+                             temps_limite: float = 60.0,
+                             max_workers: int = None):
+    """Résout chaque composante connexe comme un problème à part, en parallèle
+
+    Les composantes sont réparties en lots, un par processus, et résolues
+    avec `configuration` (par défaut le retour arrière DSatur). Les plannings
+    sont ensuite fusionnés: deux composantes peuvent réclamer trop de salles
+    dans un même créneau, ce que corrige une dernière passe de recherche
+    locale partant du planning fusionné, dans le temps restant.
+
+    Renvoie (solution, nb_violations, infaisable). Si le retour arrière
+    prouve qu'une composante n'a pas de solution, le problème entier n'en a
+    pas: la réconciliation est sautée et (None, None, True) est renvoyé.
+    """
+    debut = time.time()
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if configuration is None:
+        configuration = ConfigurationSolveur("retour_arriere", ordre="dsatur")
+
+    composantes = composantes_connexes(planificateur)
+    if not composantes:
+        return {}, 0, False
+    print(f"Décomposition: {len(composantes)} composante(s), "
+          f"la plus grande compte {len(composantes[0])} examen(s)")
+
+    # Index étudiant -> examens de chaque composante, en un seul parcours
+    numero = {examen: k for k, composante in enumerate(composantes) for examen in composante}
+    index_par_composante = [{} for _ in composantes]
+    for etudiant, examens in planificateur.graphe.index_etudiants.items():
+        retenus = [e for e in examens if e in numero]
+        if retenus:
+            index_par_composante[numero[retenus[0]]][etudiant] = retenus
+    sous_problemes = [planificateur.sous_probleme(composante, index)
+                      for composante, index in zip(composantes, index_par_composante)]
+
+    planning = {}
+    toutes_resolues = True
+    infaisable = False
+    lots = _repartir(composantes, max_workers)
+    with multiprocessing.Manager() as gestionnaire, \
+            ProcessPoolExecutor(max_workers=len(lots)) as executeur:
+        arret = gestionnaire.Event()
+        futures = [executeur.submit(_resoudre_lot, [sous_problemes[k] for k in lot],
+                                    configuration, debut + temps_limite, arret)
+                   for lot in lots]
+        _, en_cours = wait(futures, timeout=max(debut + temps_limite - time.time(), 0))
+        if en_cours:
+            arret.set()
+        for future in futures:
+            for planning_composante, resolue, preuve in future.result():
+                planning.update(planning_composante)
+                toutes_resolues = toutes_resolues and resolue
+                infaisable = infaisable or preuve
+
+    if infaisable:
+        print("Décomposition: une composante n'a pas de solution")
+        return None, None, True
+    solution, non_places = planificateur.completer_affectation(planning)
+    if toutes_resolues and not non_places:
+        return solution, 0, False
+
+    # Réconciliation: le planning fusionné sert de point de départ
+    restant = max(debut + temps_limite - time.time(), 1.0)
+    solution, violations = RechercheLocale(planificateur).optimiser(restant, depart=planning, temperature=0.5)
+    return solution, violations, False
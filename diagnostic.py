@@ -0,0 +1,239 @@
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List
+
+from projet_csp.heuristiques import Echeance
+from projet_csp.propagation import niveaux_salles, propager
+
+if TYPE_CHECKING:
+    from projet_csp.planification import PlanificateurCSP
+
+
+@dataclass
+class Incoherence:
+    """Raison pour laquelle aucun planning ne peut exister
+
+    `nature`: "domaine", "prerequis", "propagation", "clique", "salles",
+    "enseignants" ou "noyau" (sous-ensemble minimal insatisfiable). `contraintes` décrit
+    les contraintes en cause entre les `examens` concernés.
+    """
+    nature: str
+    message: str
+    examens: List[str]
+    contraintes: List[str] = field(default_factory=list)
+
+
+# Cause de l'absence de créneau (voir PlanificateurCSP.preparer_domaines)
+CAUSES_DOMAINE = {
+    "enseignant": "aucun enseignant pour le surveiller",
+    "capacite": "aucune salle assez grande",
+    "duree": "plus long que tous les créneaux",
+    "disponibilite": "aucune salle assez grande libre pendant un créneau assez long",
+}
+
+
+def _creneaux(planificateur: "PlanificateurCSP", examens) -> set:
+    creneaux = set()
+    for examen in examens:
+        creneaux.update(planificateur.domains[examen])
+    return creneaux
+
+
+def clique_gloutonne(planificateur: "PlanificateurCSP", depart: str) -> List[str]:
+    """Clique du graphe de conflits obtenue en ajoutant, tant que possible,
+    le voisin commun de plus grand degré"""
+    graphe = planificateur.graphe
+    clique = [depart]
+    candidats = {v for v in graphe.voisins(depart) if v in planificateur.domains}
+    while candidats:
+        suivant = max(candidats, key=lambda e: (graphe.degre(e), e))
+        clique.append(suivant)
+        candidats.intersection_update(graphe.voisins(suivant))
+    return clique
+
+
+def conditions_necessaires(planificateur: "PlanificateurCSP", nb_cliques: int = 50) -> List[Incoherence]:
+    """Conditions nécessaires à l'existence d'un planning, vérifiées sans recherche
+
+    - domaine: examen sans aucun créneau possible, avant toute contrainte
+      entre examens (sans surveillant, sans salle assez grande, trop long);
+    - prérequis: cycle ou chaîne trop longue pour la session, et domaine
+      vidé par la propagation (voir `PlanificateurCSP.ajouter_contraintes`);
+    - clique: des examens deux à deux en conflit occupent des créneaux
+      distincts, il en faut donc au moins autant que la clique a d'examens
+      (cliques gloutonnes depuis les `nb_cliques` examens de plus haut degré);
+    - salles: les examens qui exigent une salle d'au moins C places ne
+      peuvent être plus nombreux que les couples (salle, créneau) qui les
+      accueillent;
+    - enseignants: les examens qui ne peuvent être surveillés que par un
+      ensemble E d'enseignants ne peuvent être plus de |E| par créneau.
+
+    Renvoie la liste des conditions violées: si elle n'est pas vide, aucune
+    recherche ne peut aboutir.
+    """
+    incoherences = []
+    for examen, (cause, detail) in planificateur.sans_domaine.items():
+        incoherences.append(Incoherence(
+            "domaine", f"Aucun créneau possible pour {examen}: {CAUSES_DOMAINE[cause]}",
+            [examen], [f"{cause}: {detail}"]))
+    for chaine in planificateur.chaines_impossibles:
+        incoherences.append(Incoherence(
+            "prerequis", f"Chaîne de prérequis impossible dans la session: {' > '.join(chaine)}",
+            list(dict.fromkeys(chaine)),
+            [f"{avant} avant {apres}" for avant, apres in zip(chaine, chaine[1:])]))
+    if planificateur.domaine_vide is not None:
+        incoherences.append(Incoherence(
+            "propagation", f"Plus aucun créneau possible pour {planificateur.domaine_vide} "
+                           "après propagation des contraintes", [planificateur.domaine_vide]))
+
+    graphe = planificateur.graphe
+    examens = planificateur.variables
+    departs = sorted(examens, key=lambda e: (-graphe.degre(e), e))[:nb_cliques]
+    for clique in dict.fromkeys(tuple(sorted(clique_gloutonne(planificateur, e))) for e in departs):
+        creneaux = _creneaux(planificateur, clique)
+        if len(clique) > len(creneaux):
+            incoherences.append(Incoherence(
+                "clique", f"{len(clique)} examens deux à deux en conflit pour {len(creneaux)} créneau(x)",
+                list(clique), [f"conflit d'étudiants: {a} / {b}" for i, a in enumerate(clique)
+                               for b in clique[i + 1:]]))
+            break
+
+    niveaux, niveau_examen, salles_par_niveau = niveaux_salles(planificateur, examens)
+    par_niveau = sorted(examens, key=lambda e: -niveau_examen[e])
+    creneaux, i = set(), 0
+    for k in range(len(niveaux) - 1, -1, -1):
+        debut = i
+        while i < len(par_niveau) and niveau_examen[par_niveau[i]] >= k:
+            creneaux.update(planificateur.domains[par_niveau[i]])
+            i += 1
+        if i == debut:
+            continue
+        offre = sum(salles_par_niveau[c][k] for c in creneaux)
+        if i > offre:
+            demande = f"exigent une salle d'au moins {niveaux[k]} places" if k else "à placer"
+            incoherences.append(Incoherence(
+                "salles", f"{i} examen(s) {demande}, seulement {offre} couple(s) salle/créneau possibles",
+                par_niveau[:i], [f"capacité >= {niveaux[k]} places"]))
+            break
+
+    eligibles = planificateur.enseignants_eligibles
+    par_ensemble, ensembles_de = {}, {}
+    for examen in examens:
+        ensemble = frozenset(eligibles[examen])
+        par_ensemble.setdefault(ensemble, []).append(examen)
+        for enseignant in ensemble:
+            ensembles_de.setdefault(enseignant, set()).add(ensemble)
+    for ensemble in par_ensemble:
+        inclus = {autre for enseignant in ensemble for autre in ensembles_de[enseignant] if autre <= ensemble}
+        concernes = [e for autre in inclus for e in par_ensemble[autre]]
+        creneaux = _creneaux(planificateur, concernes)
+        if len(concernes) > len(ensemble) * len(creneaux):
+            noms = sorted(planificateur.noms_enseignants[t] for t in ensemble)
+            incoherences.append(Incoherence(
+                "enseignants", f"{len(concernes)} examen(s) ne peuvent être surveillés que par "
+                               f"{', '.join(noms)}, sur {len(creneaux)} créneau(x)",
+                concernes, [f"surveillants possibles: {', '.join(noms)}"]))
+            break
+    return incoherences
+
+
+class ExtracteurNoyau:
+    """Extraction d'un sous-ensemble minimal d'examens sans planning possible
+
+    Suppression par blocs: on retire des blocs d'examens de taille
+    décroissante tant que le reste demeure insatisfiable, jusqu'aux examens
+    un par un. Chaque test vérifie les conditions nécessaires, propage, puis
+    lance le retour arrière borné dans le temps; un test non conclu compte
+    comme satisfiable, l'examen est alors gardé (le noyau reste
+    insatisfiable mais peut ne plus être minimal).
+    """
+
+    def __init__(self, planificateur: "PlanificateurCSP", temps_limite: float = 30.0):
+        self.planificateur = planificateur
+        self.fin = time.perf_counter() + temps_limite
+        self.minimal = True
+
+    def extraire(self, examens: List[str] = None) -> List[str]:
+        """Noyau insatisfiable contenu dans `examens` (tous par défaut), ou
+        None si leur insatisfiabilité n'a pu être prouvée"""
+        noyau = list(self.planificateur.variables if examens is None else examens)
+        if not self._insatisfiable(noyau):
+            return None
+        taille = len(noyau) // 2
+        while taille >= 1:
+            i = 0
+            while i < len(noyau):
+                essai = noyau[:i] + noyau[i + taille:]
+                if essai and self._insatisfiable(essai):
+                    noyau = essai
+                else:
+                    i += taille
+            taille //= 2
+        return noyau
+
+    def _insatisfiable(self, examens: List[str]) -> bool:
+        restant = self.fin - time.perf_counter()
+        if restant <= 0:
+            self.minimal = False
+            return False
+        # L'index des étudiants ne sert qu'à l'objectif: inutile de le restreindre ici
+        sous = self.planificateur.sous_probleme(examens, {})
+        if conditions_necessaires(sous):
+            return True
+        reduits, vide = propager(sous)
+        if vide is not None:
+            return True
+        sous.domains.update(reduits)
+        sous.construire_probleme()
+        arret = Echeance(min(restant, max(restant / 8, 0.1)))
+        if sous.resoudre(mode="first", ordre="dsatur", arret=arret) is not None:
+            return False
+        if arret.is_set():
+            self.minimal = False
+            return False
+        return True
+
+    def contraintes(self, noyau: List[str]) -> List[str]:
+        """Contraintes qui relient les examens du noyau"""
+        planificateur = self.planificateur
+        retenus = set(noyau)
+        contraintes = []
+        for i, exam1 in enumerate(noyau):
+            for exam2 in noyau[i + 1:]:
+                poids = planificateur.graphe.poids(exam1, exam2)
+                if poids:
+                    contraintes.append(f"conflit d'étudiants: {exam1} / {exam2} ({poids} en commun)")
+        contraintes += [f"prérequis: {avant} avant {apres}" for avant, apres in planificateur.prerequis
+                        if avant in retenus and apres in retenus]
+
+        par_enseignant = {}
+        for examen in noyau:
+            eligibles = planificateur.enseignants_eligibles[examen]
+            if len(eligibles) == 1:
+                par_enseignant.setdefault(eligibles[0], []).append(examen)
+        for enseignant, examens in par_enseignant.items():
+            if len(examens) > 1:
+                contraintes.append(f"seul surveillant possible {planificateur.noms_enseignants[enseignant]}: "
+                                   f"{', '.join(examens)}")
+
+        niveaux, niveau_examen, _ = niveaux_salles(planificateur, noyau)
+        for k in sorted(set(niveau_examen.values()), reverse=True):
+            exigeants = [e for e in noyau if niveau_examen[e] >= k]
+            if len(exigeants) > 1 and k > 0:
+                contraintes.append(f"salle d'au moins {niveaux[k]} places: {', '.join(exigeants)}")
+                break
+        contraintes.append(f"créneaux possibles: {len(_creneaux(planificateur, noyau))}")
+        return contraintes
+
+
+def noyau_insatisfiable(planificateur: "PlanificateurCSP", temps_limite: float = 30.0,
+                        examens: List[str] = None) -> Incoherence:
+    """Sous-ensemble minimal insatisfiable (voir ExtracteurNoyau) décrit
+    comme une Incoherence, ou None si l'insatisfiabilité n'est pas prouvée"""
+    extracteur = ExtracteurNoyau(planificateur, temps_limite)
+    noyau = extracteur.extraire(examens)
+    if noyau is None:
+        return None
+    precision = "" if extracteur.minimal else " (peut-être non minimal)"
+    return Incoherence("noyau", f"Aucun planning possible pour ces {len(noyau)} examen(s){precision}: "
+                                f"{', '.join(noyau)}", noyau, extracteur.contraintes(noyau))
@@ -0,0 +1,78 @@
+from typing import TYPE_CHECKING, Dict, Iterator, List, Tuple
+
+if TYPE_CHECKING:
+    from projet_csp.planification import ExamenCSP
+
+
+class GrapheConflits:
+    """Graphe des conflits entre examens (étudiants en commun)
+
+    Le graphe est construit à partir d'un index inversé étudiant -> examens:
+    seules les paires d'examens réellement partagées par un étudiant sont
+    visitées, au lieu de croiser les listes d'étudiants de toutes les paires.
+    Chaque arête porte comme poids le nombre d'étudiants en commun.
+    L'index peut être fourni tout construit (voir `chargement.charger_session`).
+    """
+
+    def __init__(self, examens: List["ExamenCSP"], index_etudiants: Dict[str, List[str]] = None):
+        self.index_etudiants: Dict[str, List[str]] = {}  # etudiant -> examens
+        self.adjacence: Dict[str, Dict[str, int]] = {}  # examen -> {voisin: poids}
+
+        for examen in examens:
+            self.adjacence.setdefault(examen.nom, {})
+            if index_etudiants is None:
+                for etudiant in set(examen.etudiants):
+                    self.index_etudiants.setdefault(etudiant, []).append(examen.nom)
+        if index_etudiants is not None:
+            self.index_etudiants = index_etudiants
+
+        for examens_etudiant in self.index_etudiants.values():
+            for i, exam1 in enumerate(examens_etudiant):
+                voisins1 = self.adjacence[exam1]
+                for exam2 in examens_etudiant[i + 1:]:
+                    voisins1[exam2] = voisins1.get(exam2, 0) + 1
+                    voisins2 = self.adjacence[exam2]
+                    voisins2[exam1] = voisins2.get(exam1, 0) + 1
+
+    def voisins(self, examen: str) -> Dict[str, int]:
+        """Examens en conflit avec `examen` et nombre d'étudiants communs"""
+        return self.adjacence.get(examen, {})
+
+    def poids(self, exam1: str, exam2: str) -> int:
+        """Nombre d'étudiants communs aux deux examens"""
+        return self.adjacence.get(exam1, {}).get(exam2, 0)
+
+    def degre(self, examen: str) -> int:
+        """Nombre d'examens en conflit avec `examen`"""
+        return len(self.adjacence.get(examen, {}))
+
+    def aretes(self) -> Iterator[Tuple[str, str, int]]:
+        """Parcourt chaque arête une seule fois: (examen1, examen2, poids)"""
+        for exam1, voisins in self.adjacence.items():
+            for exam2, poids in voisins.items():
+                if exam1 < exam2:
+                    yield exam1, exam2, poids
+
+    def sous_graphe(self, examens: List[str],
+                    index_etudiants: Dict[str, List[str]] = None) -> "GrapheConflits":
+        """Graphe induit par un sous-ensemble d'examens
+
+        `index_etudiants`, s'il est fourni, doit être l'index déjà restreint à
+        ces examens: il évite de parcourir l'index complet.
+        """
+        retenus = set(examens)
+        sous = GrapheConflits([])
+        for examen in examens:
+            sous.adjacence[examen] = {voisin: poids for voisin, poids in self.voisins(examen).items()
+                                      if voisin in retenus}
+        if index_etudiants is None:
+            index_etudiants = {}
+            for etudiant, examens_etudiant in self.index_etudiants.items():
+                communs = [e for e in examens_etudiant if e in retenus]
+                if communs:
+                    index_etudiants[etudiant] = communs
+        sous.index_etudiants = index_etudiants
+        return sous
+
+    def nombre_aretes(self) -> int:
+        return sum(len(voisins) for voisins in self.adjacence.values()) // 2
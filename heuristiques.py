@@ -0,0 +1,241 @@
+import heapq
+import time
+from typing import Dict, List, Sequence
+
+from constraint import Solver
+
+from projet_csp.graphe_conflits import GrapheConflits
+
+
+class Echeance:
+    """Signal d'arrêt (voir SolveurHeuristique) levé à une date donnée"""
+
+    def __init__(self, duree: float):
+        self.fin = time.perf_counter() + duree
+
+    def is_set(self) -> bool:
+        return time.perf_counter() >= self.fin
+
+
+def ordre_degre_decroissant(graphe: GrapheConflits, examens: Sequence[str]) -> List[str]:
+    """Ordre "plus grand degré d'abord" dans le graphe de conflits"""
+    return sorted(examens, key=lambda e: (-graphe.degre(e), e))
+
+
+def coloration_dsatur(graphe: GrapheConflits,
+                      domaines: Dict[str, Sequence[int]],
+                      capacites: Dict[int, int] = None) -> Dict[str, int]:
+    """Coloration gloutonne DSatur du graphe de conflits
+
+    Les examens sont colorés un à un, en choisissant toujours celui dont
+    les voisins utilisent le plus de créneaux différents (saturation), puis
+    celui de plus grand degré. Chaque examen reçoit le premier créneau de
+    son domaine qui n'est utilisé par aucun voisin et dont la capacité
+    (nombre d'examens simultanés, optionnelle) n'est pas atteinte.
+
+    Renvoie {examen: créneau}; les examens qui n'ont pu être colorés sont
+    absents du résultat. Sert de point de départ aux solveurs.
+    """
+    coloration = {}
+    occupation = {}  # creneau -> nombre d'examens
+    saturation = {examen: set() for examen in domaines}
+    tas = [(0, -graphe.degre(examen), examen) for examen in domaines]
+    heapq.heapify(tas)
+    traites = set()
+
+    while tas:
+        sat, _, examen = heapq.heappop(tas)
+        if examen in traites or -sat != len(saturation[examen]):
+            continue  # entrée périmée
+        traites.add(examen)
+
+        interdits = saturation[examen]
+        for creneau in domaines[examen]:
+            if creneau in interdits:
+                continue
+            if capacites is not None and occupation.get(creneau, 0) >= capacites.get(creneau, 0):
+                continue
+            coloration[examen] = creneau
+            occupation[creneau] = occupation.get(creneau, 0) + 1
+            break
+        else:
+            continue
+
+        for voisin in graphe.voisins(examen):
+            if voisin in saturation and voisin not in traites and creneau not in saturation[voisin]:
+                saturation[voisin].add(creneau)
+                heapq.heappush(tas, (-len(saturation[voisin]), -graphe.degre(voisin), voisin))
+
+    return coloration
+
+
+class SolveurHeuristique(Solver):
+    """Solveur à retour arrière guidé par le graphe de conflits
+
+    S'utilise comme les solveurs de python-constraint
+    (`problem.setSolver(...)`), avec:
+    - un ordre des variables "dsatur" (examens réduits à un seul créneau,
+      puis saturation puis degré, dynamique) ou "degre" (plus grand degré
+      d'abord, statique);
+    - un ordre des valeurs "moins contraignante d'abord": le créneau qui
+      retire le moins de valeurs aux voisins non affectés est essayé en
+      premier, après le créneau du point de départ éventuel;
+    - une vérification en avant limitée aux voisins de la variable affectée,
+      complétée, si `propagation` est donné (voir
+      propagation.PropagationRecherche), par la propagation des enseignants,
+      des salles et des chaînes de prérequis après chaque affectation.
+
+    `arret` (optionnel, par exemple un threading.Event) est consulté
+    régulièrement: dès que `arret.is_set()` est vrai, la recherche s'arrête
+    comme si l'espace était épuisé. `progression` (optionnel) est appelé au
+    même rythme avec (noeuds explorés, plus petit nombre d'examens restant à
+    placer atteint jusque-là).
+    """
+
+    def __init__(self, graphe: GrapheConflits, ordre: str = "dsatur",
+                 depart: Dict[str, int] = None, forwardcheck: bool = True,
+                 arret=None, progression=None, propagation=None):
+        if ordre not in ("dsatur", "degre"):
+            raise ValueError(f"Ordre des variables inconnu: {ordre}")
+        self.graphe = graphe
+        self.ordre = ordre
+        self.depart = depart or {}
+        self._forwardcheck = forwardcheck
+        self.arret = arret
+        self.progression = progression
+        self.propagation = propagation
+        self.noeuds = 0  # noeuds explorés par la dernière recherche
+        self.retours = 0  # retours arrière de la dernière recherche
+
+    def getSolution(self, domains, constraints, vconstraints):
+        return next(self.getSolutionIter(domains, constraints, vconstraints), None)
+
+    def getSolutions(self, domains, constraints, vconstraints):
+        return list(self.getSolutionIter(domains, constraints, vconstraints))
+
+    def getSolutionIter(self, domains, constraints, vconstraints):
+        assignments = {}
+        saturation = {variable: {} for variable in domains}  # variable -> {creneau: nb voisins}
+        ordre_statique = ordre_degre_decroissant(self.graphe, domains)
+        pile = []  # (variable, valeurs restantes, domaines empilés)
+
+        variable = self._choisir_variable(domains, assignments, saturation, ordre_statique)
+        if variable is None:
+            yield {}
+            return
+        valeurs = self._ordonner_valeurs(variable, domains, assignments)
+
+        self.noeuds = self.retours = 0
+        if self.propagation is not None:
+            self.propagation.reinitialiser()
+        plus_profond = 0
+        while True:
+            self.noeuds += 1
+            if self.noeuds % 256 == 0:
+                if self.progression is not None:
+                    self.progression(self.noeuds, len(domains) - plus_profond)
+                if self.arret is not None and self.arret.is_set():
+                    return
+            trouve = False
+            while valeurs:
+                valeur = valeurs.pop()
+                empiles = self._domaines_touches(variable, domains, assignments, vconstraints)
+                for domaine in empiles:
+                    domaine.pushState()
+                self._affecter(variable, valeur, assignments, saturation)
+                if self._coherent(variable, valeur, domains, assignments, vconstraints, empiles):
+                    trouve = True
+                    break
+                self._desaffecter(variable, assignments, saturation)
+                for domaine in empiles:
+                    domaine.popState()
+
+            if trouve:
+                pile.append((variable, valeurs, empiles))
+                plus_profond = max(plus_profond, len(assignments))
+                variable = self._choisir_variable(domains, assignments, saturation, ordre_statique)
+                if variable is not None:
+                    valeurs = self._ordonner_valeurs(variable, domains, assignments)
+                    continue
+                yield assignments.copy()
+
+            # Plus de valeur possible (ou solution produite): retour arrière
+            if not pile:
+                return
+            self.retours += 1
+            variable, valeurs, empiles = pile.pop()
+            self._desaffecter(variable, assignments, saturation)
+            for domaine in empiles:
+                domaine.popState()
+
+    def _choisir_variable(self, domains, assignments, saturation, ordre_statique):
+        if self.ordre == "degre":
+            return next((v for v in ordre_statique if v not in assignments), None)
+
+        meilleure, meilleure_cle = None, None
+        for variable in domains:
+            if variable in assignments:
+                continue
+            cle = (len(domains[variable]) <= 1, len(saturation[variable]), self.graphe.degre(variable),
+                   -len(domains[variable]))
+            if meilleure_cle is None or cle > meilleure_cle:
+                meilleure, meilleure_cle = variable, cle
+        return meilleure
+
+    def _ordonner_valeurs(self, variable, domains, assignments):
+        """Valeurs triées de la moins bonne à la meilleure (consommées par pop())"""
+        voisins = [domains[v] for v in self.graphe.voisins(variable)
+                   if v in domains and v not in assignments]
+        prefere = self.depart.get(variable)
+
+        def cle(valeur):
+            retraits = sum(1 for domaine in voisins if valeur in domaine)
+            return valeur == prefere, -retraits, -valeur
+
+        return sorted(domains[variable], key=cle)
+
+    def _domaines_touches(self, variable, domains, assignments, vconstraints):
+        """Domaines que la vérification en avant peut réduire"""
+        if not self._forwardcheck:
+            return []
+        touches = {v for v in self.graphe.voisins(variable) if v in domains}
+        for _, variables in vconstraints[variable]:
+            touches.update(variables)
+        return [domains[v] for v in touches if v != variable and v not in assignments]
+
+    def _coherent(self, variable, valeur, domains, assignments, vconstraints, empiles):
+        for constraint, variables in vconstraints[variable]:
+            if not constraint(variables, domains, assignments, empiles):
+                return False
+        if self._forwardcheck:
+            for voisin in self.graphe.voisins(variable):
+                if voisin in assignments or voisin not in domains:
+                    continue
+                domaine = domains[voisin]
+                if valeur in domaine:
+                    domaine.hideValue(valeur)
+                    if not domaine:
+                        return False
+            if self.propagation is not None:
+                return self.propagation.propager(variable, valeur, domains, assignments, empiles)
+        return True
+
+    def _affecter(self, variable, valeur, assignments, saturation):
+        assignments[variable] = valeur
+        if self.propagation is not None:
+            self.propagation.affecter(variable, valeur)
+        for voisin in self.graphe.voisins(variable):
+            if voisin in saturation:
+                compteurs = saturation[voisin]
+                compteurs[valeur] = compteurs.get(valeur, 0) + 1
+
+    def _desaffecter(self, variable, assignments, saturation):
+        valeur = assignments.pop(variable)
+        if self.propagation is not None:
+            self.propagation.desaffecter(variable, valeur)
+        for voisin in self.graphe.voisins(variable):
+            if voisin in saturation:
+                compteurs = saturation[voisin]
+                compteurs[valeur] -= 1
+                if not compteurs[valeur]:
+                    del compteurs[valeur]
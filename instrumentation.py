@@ -0,0 +1,168 @@
+import contextlib
+import cProfile
+import functools
+import json
+import time
+from collections import Counter
+from typing import Dict, Sequence
+
+
+class SansInstrumentation:
+    """Instrumentation désactivée: chaque appel est sans effet
+
+    C'est l'instrumentation par défaut du planificateur; les points de
+    mesure fréquents (évaluations de contraintes) ne sont même pas installés,
+    seul subsiste un test par évaluation.
+    """
+    actif = False
+    compteurs = None
+
+    def phase(self, nom: str):
+        return contextlib.nullcontext()
+
+    def compter(self, nom: str, nombre: int = 1):
+        pass
+
+    def domaines(self, etape: str, domaines: Dict[str, Sequence[int]]):
+        pass
+
+
+SANS_INSTRUMENTATION = SansInstrumentation()
+
+
+class Instrumentation:
+    """Mesures d'une construction et d'une résolution
+
+    - phases: durée de chaque étape (`with instrumentation.phase(nom)`),
+      imbriquées et enregistrées comme événements d'ouverture/fermeture;
+    - compteurs: évaluations par type de contrainte ("etudiants", "salle",
+      "enseignant", "chemins_augmentants", "prerequis"), noeuds et retours
+      arrière du solveur, itérations de la recherche locale;
+    - domaines: taille minimale, moyenne et maximale des domaines et nombre
+      de valeurs après chaque étape qui les réduit.
+
+    Avec `profil=True`, cProfile est actif pendant les phases de premier
+    niveau. Exports: JSON (`exporter_json`), profil evented de speedscope
+    (`exporter_speedscope`), statistiques cProfile (`exporter_cprofile`).
+
+    Une instrumentation envoyée dans un autre processus (portefeuille,
+    composantes) y devient inactive: seules les phases du processus
+    principal sont mesurées.
+    """
+    actif = True
+
+    def __init__(self, profil: bool = False):
+        self.origine = time.perf_counter()
+        self.evenements = []  # ("O" ou "C", nom, instant relatif)
+        self.compteurs = Counter()
+        self.statistiques = {}  # étape -> statistiques des domaines
+        self.profileur = cProfile.Profile() if profil else None
+        self._profondeur = 0
+
+    def __reduce__(self):
+        return SansInstrumentation, ()
+
+    @contextlib.contextmanager
+    def phase(self, nom: str):
+        if self._profondeur == 0 and self.profileur is not None:
+            self.profileur.enable()
+        self._profondeur += 1
+        self.evenements.append(("O", nom, time.perf_counter() - self.origine))
+        try:
+            yield
+        finally:
+            self.evenements.append(("C", nom, time.perf_counter() - self.origine))
+            self._profondeur -= 1
+            if self._profondeur == 0 and self.profileur is not None:
+                self.profileur.disable()
+
+    def compter(self, nom: str, nombre: int = 1):
+        self.compteurs[nom] += nombre
+
+    def domaines(self, etape: str, domaines: Dict[str, Sequence[int]]):
+        tailles = [len(d) for d in domaines.values()]
+        self.statistiques[etape] = {
+            "variables": len(tailles),
+            "valeurs": sum(tailles),
+            "min": min(tailles, default=0),
+            "moyenne": round(sum(tailles) / len(tailles), 2) if tailles else 0,
+            "max": max(tailles, default=0),
+        }
+
+    def phases(self):
+        """Phases terminées: [{nom, debut, duree, profondeur}], dans l'ordre d'ouverture"""
+        resultat, ouvertes = [], []
+        for type_evenement, nom, instant in self.evenements:
+            if type_evenement == "O":
+                ouvertes.append(len(resultat))
+                resultat.append({"nom": nom, "debut": round(instant, 6), "duree": None,
+                                 "profondeur": len(ouvertes) - 1})
+            else:
+                phase = resultat[ouvertes.pop()]
+                phase["duree"] = round(instant - phase["debut"], 6)
+        return [phase for phase in resultat if phase["duree"] is not None]
+
+    def en_dict(self) -> Dict:
+        totaux = Counter()
+        for phase in self.phases():
+            totaux[phase["nom"]] += phase["duree"]
+        return {
+            "phases": self.phases(),
+            "totaux": {nom: round(duree, 6) for nom, duree in totaux.items()},
+            "compteurs": dict(self.compteurs),
+            "domaines": self.statistiques,
+        }
+
+    def exporter_json(self, chemin: str):
+        with open(chemin, "w", encoding="utf-8") as f:
+            json.dump(self.en_dict(), f, ensure_ascii=False, indent=2)
+            f.write("\n")
+
+    def exporter_speedscope(self, chemin: str, nom: str = "planification"):
+        """Profil "evented" lisible par https://www.speedscope.app"""
+        cadres, indices, evenements = [], {}, []
+        for type_evenement, phase, instant in self.evenements:
+            if phase not in indices:
+                indices[phase] = len(cadres)
+                cadres.append({"name": phase})
+            evenements.append({"type": type_evenement, "frame": indices[phase], "at": instant})
+        fin = evenements[-1]["at"] if evenements else 0
+        profil = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": cadres},
+            "profiles": [{"type": "evented", "name": nom, "unit": "seconds",
+                          "startValue": 0, "endValue": fin, "events": evenements}],
+            "name": nom,
+            "exporter": "projet_csp.instrumentation",
+        }
+        with open(chemin, "w", encoding="utf-8") as f:
+            json.dump(profil, f)
+
+    def exporter_cprofile(self, chemin: str):
+        """Statistiques cProfile (pstats), par exemple pour snakeviz ou
+        `python -m pstats`; nécessite `profil=True`"""
+        if self.profileur is None:
+            raise ValueError("Profil cProfile non demandé (Instrumentation(profil=True))")
+        self.profileur.dump_stats(chemin)
+
+    def exporter(self, chemin: str):
+        """Export selon l'extension: .prof / .pstats (cProfile),
+        .speedscope.json (speedscope), sinon JSON"""
+        if chemin.endswith((".prof", ".pstats")):
+            self.exporter_cprofile(chemin)
+        elif chemin.endswith(".speedscope.json"):
+            self.exporter_speedscope(chemin)
+        else:
+            self.exporter_json(chemin)
+
+
+def mesuree(nom: str):
+    """Décore une méthode d'un objet qui a un attribut `instrumentation`:
+    chaque appel est mesuré comme la phase `nom`"""
+    def decorateur(methode):
+        @functools.wraps(methode)
+        def enveloppe(self, *args, **kwargs):
+            with self.instrumentation.phase(nom):
+                return methode(self, *args, **kwargs)
+        return enveloppe
+    return decorateur
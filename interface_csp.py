@@ -1,7 +1,12 @@
+import queue
+import threading
+import time as chrono
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox, scrolledtext, filedialog
 from datetime import time
 
+from projet_csp.cache_modele import CacheModeles
+from projet_csp.chargement import charger_dossier
 from projet_csp.planification import ExamenCSP, SalleCSP, PlanificateurCSP
 
 class CSPInterface(tk.Tk):
@@ -54,11 +59,26 @@ class CSPInterface(tk.Tk):
         self.prerequis = tk.Text(frame_pre, height=3, width=80)
         self.prerequis.grid(row=1, column=0, padx=5, pady=5)
 
-        # ================== BOUTON ==================
-        self.btn_resoudre = tk.Button(self, text="Résoudre le CSP", font=("Arial", 14, "bold"),
+        # ================== BOUTONS ==================
+        frame_btn = tk.Frame(self, bg="#f0f2f5")
+        frame_btn.pack(pady=10)
+
+        self.btn_importer = tk.Button(frame_btn, text="Importer un dossier...", command=self.importer_donnees)
+        self.btn_importer.pack(side="left", padx=5)
+
+        tk.Label(frame_btn, text="Temps limite (s)", bg="#f0f2f5").pack(side="left")
+        self.temps_limite = tk.Entry(frame_btn, width=6)
+        self.temps_limite.insert(0, "60")
+        self.temps_limite.pack(side="left", padx=5)
+
+        self.btn_resoudre = tk.Button(frame_btn, text="Résoudre le CSP", font=("Arial", 14, "bold"),
                                      bg="#4CAF50", fg="white", activebackground="#45a049",
                                      command=self.executer_csp)
-        self.btn_resoudre.pack(pady=10)
+        self.btn_resoudre.pack(side="left", padx=5)
+
+        self.btn_annuler = tk.Button(frame_btn, text="Annuler", font=("Arial", 14, "bold"),
+                                    state="disabled", command=self.annuler_csp)
+        self.btn_annuler.pack(side="left", padx=5)
 
         # ================== TABLEAU ==================
         frame_table = tk.Frame(self)
@@ -76,11 +96,62 @@ class CSPInterface(tk.Tk):
         self.resultat = scrolledtext.ScrolledText(self, width=100, height=6)
         self.resultat.pack(pady=5, padx=20)
 
+        # ================== RÉSOLUTION EN ARRIÈRE-PLAN ==================
+        # Le solveur tourne dans un thread; il ne touche jamais aux widgets et
+        # communique par une file, relevée périodiquement avec after()
+        self.messages = queue.Queue()
+        self.annulation = threading.Event()
+        self.minuterie = None
+        self.debut = None
+        self.noeuds = 0
+        self.meilleur_cout = None
+
+        # Données importées (voir chargement.charger_dossier), chargées elles
+        # aussi hors du thread de Tk
+        self.donnees = None
+        self.imports = queue.Queue()
+
+        # Modèles compilés des dernières résolutions: relancer sur les mêmes
+        # données ne reconstruit ni les domaines ni le graphe de conflits
+        self.cache = CacheModeles()
+
+    def importer_donnees(self):
+        dossier = filedialog.askdirectory(title="Dossier contenant examens, inscriptions et salles")
+        if not dossier:
+            return
+        self.btn_importer.config(state="disabled")
+        self.resultat.delete("1.0", tk.END)
+        self.resultat.insert(tk.END, f"Import de {dossier}...\n")
+        threading.Thread(target=self._importer_en_arriere_plan, args=(dossier,), daemon=True).start()
+        self.after(100, self._suivre_import)
+
+    def _importer_en_arriere_plan(self, dossier):
+        try:
+            self.imports.put(("donnees", charger_dossier(dossier)))
+        except Exception as e:
+            self.imports.put(("erreur", str(e)))
+
+    def _suivre_import(self):
+        try:
+            nature, contenu = self.imports.get_nowait()
+        except queue.Empty:
+            self.after(100, self._suivre_import)
+            return
+        self.btn_importer.config(state="normal")
+        if nature == "erreur":
+            messagebox.showerror("Erreur", contenu)
+            return
+        self.donnees = contenu
+        self.resultat.insert(tk.END, f"✅ {len(contenu.examens)} examen(s), {len(contenu.salles)} salle(s), "
+                                     f"{len(contenu.index_etudiants)} étudiant(s), "
+                                     f"{len(contenu.prerequis)} prérequis importés\n")
+
     def executer_csp(self):
         try:
-            examens = []
-            salles = []
-            prerequis = []
+            examens = list(self.donnees.examens) if self.donnees else []
+            salles = list(self.donnees.salles) if self.donnees else []
+            prerequis = list(self.donnees.prerequis) if self.donnees else []
+            index_etudiants = self.donnees.index_etudiants if self.donnees else None
 
             # ----- Examens -----
             nom = self.exam_nom.get().strip()
@@ -88,6 +159,7 @@ class CSPInterface(tk.Tk):
             ens = self.exam_ens.get().strip()
             etu = self.exam_etu.get().strip()
             if nom and duree and ens and etu:
+                index_etudiants = None  # l'index importé ne couvre pas cet examen
                 examens.append(
                     ExamenCSP(
                         nom=nom,
@@ -109,29 +181,93 @@ class CSPInterface(tk.Tk):
                     a, b = ligne.split(">")
                     prerequis.append((a.strip(), b.strip()))
 
-            # ----- CSP -----
-            planificateur = PlanificateurCSP()
-            creneaux = planificateur.creer_creneaux(time(8, 0), time(18, 0), 2)
-            planificateur.preparer_domaines(examens, salles, creneaux)
-            planificateur.ajouter_contraintes(examens, prerequis)
-            solutions = planificateur.resoudre()
+            limite = float(self.temps_limite.get().strip() or 60)
+
+        except Exception as e:
+            messagebox.showerror("Erreur", str(e))
+            return
+
+        # ----- CSP, dans un thread -----
+        self.resultat.delete("1.0", tk.END)
+        for i in self.tree.get_children():
+            self.tree.delete(i)
+        self.resultat.insert(tk.END, "\n")  # ligne de progression
 
-            self.resultat.delete("1.0", tk.END)
-            for i in self.tree.get_children():
-                self.tree.delete(i)
+        self.annulation.clear()
+        self.minuterie = threading.Timer(limite, self.annulation.set)
+        self.minuterie.daemon = True
+        self.debut = chrono.perf_counter()
+        self.noeuds, self.meilleur_cout = 0, None
+        self.btn_resoudre.config(state="disabled")
+        self.btn_annuler.config(state="normal")
 
-            if not solutions:
-                self.resultat.insert(tk.END, "❌ Aucune solution trouvée\n")
-                return
+        threading.Thread(target=self._resoudre_en_arriere_plan, args=(examens, salles, prerequis, index_etudiants, limite),
+                         daemon=True).start()
+        self.minuterie.start()
+        self.after(100, self._suivre_resolution)
 
-            sol = solutions[0]
-            self.resultat.insert(tk.END, "✅ SOLUTION TROUVÉE\n\n")
-            for exam, (creneau, salle, enseignant) in sol.items():
-                self.tree.insert("", "end", values=(exam, f"{creneau[0]}h-{creneau[1]}h", salle, enseignant))
-                self.resultat.insert(tk.END, f"{exam} : {creneau[0]}h-{creneau[1]}h | {salle} | {enseignant}\n")
+    def annuler_csp(self):
+        self.annulation.set()
 
+    def _resoudre_en_arriere_plan(self, examens, salles, prerequis, index_etudiants, limite):
+        """Construit et résout le problème; exécuté hors du thread de Tk"""
+        try:
+            creneaux = PlanificateurCSP().creer_creneaux(time(8, 0), time(18, 0), 2)
+            planificateur = self.cache.planificateur(examens, salles, creneaux, prerequis, index_etudiants)
+            incoherences = planificateur.diagnostiquer()
+            if incoherences:
+                self.messages.put(("arret", "❌ Aucune solution possible\n"
+                                   + "\n".join(i.message for i in incoherences)))
+                return
+            sol = planificateur.resoudre(mode="first", ordre="dsatur", depart=planificateur.coloration_initiale(),
+                                         arret=self.annulation,
+                                         progression=lambda n, c: self.messages.put(("progression", n, c)))
+            if sol is not None:
+                self.messages.put(("solution", planificateur.decoder_solution(sol)))
+            elif self.annulation.is_set():
+                depasse = chrono.perf_counter() - self.debut >= limite
+                self.messages.put(("arret", "⏱ Temps limite atteint" if depasse else "⛔ Résolution annulée"))
+            else:
+                noyau = planificateur.noyau_insatisfiable(10.0)
+                detail = f"\n{noyau.message}" if noyau is not None else ""
+                self.messages.put(("arret", "❌ Aucune solution trouvée" + detail))
         except Exception as e:
-            messagebox.showerror("Erreur", str(e))
+            self.messages.put(("erreur", str(e)))
+
+    def _suivre_resolution(self):
+        """Relève les messages du solveur et met à jour l'affichage (thread de Tk)"""
+        termine = False
+        while True:
+            try:
+                message = self.messages.get_nowait()
+            except queue.Empty:
+                break
+            if message[0] == "progression":
+                _, self.noeuds, self.meilleur_cout = message
+            elif message[0] == "solution":
+                self.resultat.insert(tk.END, "✅ SOLUTION TROUVÉE\n\n")
+                for exam, (creneau, salle, enseignant) in message[1].items():
+                    self.tree.insert("", "end", values=(exam, f"{creneau[0]}h-{creneau[1]}h", salle, enseignant))
+                    self.resultat.insert(tk.END, f"{exam} : {creneau[0]}h-{creneau[1]}h | {salle} | {enseignant}\n")
+                termine = True
+            elif message[0] == "arret":
+                self.resultat.insert(tk.END, message[1] + "\n")
+                termine = True
+            elif message[0] == "erreur":
+                messagebox.showerror("Erreur", message[1])
+                termine = True
+
+        cout = "-" if self.meilleur_cout is None else f"{self.meilleur_cout} examen(s) à placer"
+        self.resultat.delete("1.0", "2.0")
+        self.resultat.insert("1.0", f"Nœuds explorés: {self.noeuds} | Meilleur coût: {cout} | "
+                                    f"Temps écoulé: {chrono.perf_counter() - self.debut:.1f}s\n")
+
+        if termine:
+            self.minuterie.cancel()
+            self.btn_resoudre.config(state="normal")
+            self.btn_annuler.config(state="disabled")
+        else:
+            self.after(100, self._suivre_resolution)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,147 @@
+from array import array
+from typing import TYPE_CHECKING, Dict
+
+if TYPE_CHECKING:
+    from projet_csp.planification import PlanificateurCSP
+
+
+class ObjectifSouple:
+    """Coût des préférences (contraintes souples) d'un planning
+
+    Pénalités, pondérées:
+    - `poids_consecutifs` par étudiant ayant deux examens dans des créneaux
+      consécutifs d'une même journée;
+    - `poids_surcharge` par examen au-delà de `max_par_jour` dans une journée,
+      pour chaque étudiant;
+    - `poids_tardif` par grand examen (au moins `seuil_grand` étudiants) placé
+      dans les `jours_tardifs` derniers jours de la session, seulement si
+      la session compte plus de `jours_tardifs` jours (sinon tous les
+      créneaux seraient tardifs et la pénalité serait la même pour tout
+      planning).
+
+    Le coût est maintenu incrémentalement: déplacer un examen coûte
+    O(degré + nombre d'étudiants de l'examen), sans réévaluer le planning.
+    Les créneaux sont les indices de `planificateur.creneaux`.
+    """
+
+    def __init__(self, planificateur: "PlanificateurCSP",
+                 poids_consecutifs: int = 1, poids_surcharge: int = 1, poids_tardif: int = 1,
+                 max_par_jour: int = 2, seuil_grand: int = 100, jours_tardifs: int = 1):
+        self.graphe = planificateur.graphe
+        self.poids_consecutifs = poids_consecutifs
+        self.poids_surcharge = poids_surcharge
+        self.poids_tardif = poids_tardif
+        self.max_par_jour = max_par_jour
+
+        bornes = planificateur.bornes_creneaux
+        self.jour = [jour for jour, _, _ in bornes]
+        self.nb_jours = max(self.jour) + 1 if bornes else 0
+
+        # Créneaux consécutifs d'une même journée
+        self.adjacents = [() for _ in bornes]
+        par_jour = {}
+        for c, (jour, debut, _) in enumerate(bornes):
+            par_jour.setdefault(jour, []).append((debut, c))
+        for creneaux in par_jour.values():
+            creneaux.sort()
+            for (_, c1), (_, c2) in zip(creneaux, creneaux[1:]):
+                self.adjacents[c1] += (c2,)
+                self.adjacents[c2] += (c1,)
+
+        if self.nb_jours > jours_tardifs:
+            premier_jour_tardif = self.nb_jours - jours_tardifs
+            self.tardif = [jour >= premier_jour_tardif for jour in self.jour]
+        else:
+            self.tardif = [False] * len(bornes)
+
+        # Étudiants de chaque examen, codés par des entiers
+        self.etudiants = {}
+        for code, examens in enumerate(self.graphe.index_etudiants.values()):
+            for examen in examens:
+                self.etudiants.setdefault(examen, array("l")).append(code)
+        self.nb_etudiants = len(self.graphe.index_etudiants)
+        self.grand = {examen for examen, etudiants in self.etudiants.items()
+                      if len(etudiants) >= seuil_grand}
+
+        self.creneau = {}
+        self.examens_par_jour = array("l")  # etudiant * nb_jours + jour -> nombre d'examens
+        self.cout = 0
+
+    def initialiser(self, planning: Dict[str, int]) -> int:
+        """Prend `planning` ({examen: créneau}) comme état courant et renvoie son coût"""
+        self.creneau = dict(planning)
+        self.examens_par_jour = array("l", [0]) * (self.nb_etudiants * self.nb_jours)
+        for examen, creneau in self.creneau.items():
+            jour = self.jour[creneau]
+            for etudiant in self.etudiants.get(examen, ()):
+                self.examens_par_jour[etudiant * self.nb_jours + jour] += 1
+        self.cout = self.evaluer(self.creneau)
+        return self.cout
+
+    def evaluer(self, planning: Dict[str, int]) -> int:
+        """Coût complet d'un planning, sans utiliser l'état courant"""
+        consecutifs = sum(poids for e1, e2, poids in self.graphe.aretes()
+                          if e1 in planning and e2 in planning and planning[e2] in self.adjacents[planning[e1]])
+
+        par_jour = {}
+        for examen, creneau in planning.items():
+            for etudiant in self.etudiants.get(examen, ()):
+                cle = (etudiant, self.jour[creneau])
+                par_jour[cle] = par_jour.get(cle, 0) + 1
+        surcharge = sum(max(0, n - self.max_par_jour) for n in par_jour.values())
+
+        tardifs = sum(1 for examen, creneau in planning.items()
+                      if examen in self.grand and self.tardif[creneau])
+
+        return (self.poids_consecutifs * consecutifs
+                + self.poids_surcharge * surcharge
+                + self.poids_tardif * tardifs)
+
+    def evaluer_solution(self, planificateur: "PlanificateurCSP", solution: Dict[str, int]) -> int:
+        """Coût d'une solution en codes complets (voir `PlanificateurCSP.encoder_valeur`)"""
+        return self.evaluer({e: planificateur.indice_creneau(code) for e, code in solution.items()})
+
+    def delta(self, examen: str, creneau: int) -> int:
+        """Variation du coût si `examen` passe dans `creneau`"""
+        ancien = self.creneau[examen]
+        if ancien == creneau:
+            return 0
+
+        consecutifs = 0
+        adjacents_ancien, adjacents_nouveau = self.adjacents[ancien], self.adjacents[creneau]
+        for voisin, poids in self.graphe.voisins(examen).items():
+            creneau_voisin = self.creneau.get(voisin)
+            if creneau_voisin is None:
+                continue
+            consecutifs += poids * ((creneau_voisin in adjacents_nouveau) - (creneau_voisin in adjacents_ancien))
+
+        surcharge = 0
+        jour_ancien, jour_nouveau = self.jour[ancien], self.jour[creneau]
+        if jour_ancien != jour_nouveau:
+            compteurs, nb_jours, maximum = self.examens_par_jour, self.nb_jours, self.max_par_jour
+            for etudiant in self.etudiants.get(examen, ()):
+                base = etudiant * nb_jours
+                surcharge += (compteurs[base + jour_nouveau] >= maximum) - (compteurs[base + jour_ancien] > maximum)
+
+        tardifs = 0
+        if examen in self.grand:
+            tardifs = self.tardif[creneau] - self.tardif[ancien]
+
+        return (self.poids_consecutifs * consecutifs
+                + self.poids_surcharge * surcharge
+                + self.poids_tardif * tardifs)
+
+    def deplacer(self, examen: str, creneau: int):
+        """Passe `examen` dans `creneau` en mettant le coût à jour"""
+        ancien = self.creneau[examen]
+        if ancien == creneau:
+            return
+        self.cout += self.delta(examen, creneau)
+
+        jour_ancien, jour_nouveau = self.jour[ancien], self.jour[creneau]
+        if jour_ancien != jour_nouveau:
+            for etudiant in self.etudiants.get(examen, ()):
+                base = etudiant * self.nb_jours
+                self.examens_par_jour[base + jour_ancien] -= 1
+                self.examens_par_jour[base + jour_nouveau] += 1
+        self.creneau[examen] = creneau
@@ -1,8 +1,22 @@
-from constraint import Problem, AllDifferentConstraint, AllEqualConstraint
+from constraint import Problem, Constraint, AllDifferentConstraint, AllEqualConstraint
+from array import array
 from datetime import time, timedelta
+from itertools import islice
 from dataclasses import dataclass
 from typing import List, Dict, Set
 
+from projet_csp.appariement import en_premier, hopcroft_karp, meilleur_ajustement
+from projet_csp.decomposition import resoudre_par_composantes
+from projet_csp.diagnostic import conditions_necessaires, noyau_insatisfiable
+from projet_csp.graphe_conflits import GrapheConflits
+from projet_csp.heuristiques import SolveurHeuristique, coloration_dsatur
+from projet_csp.instrumentation import SANS_INSTRUMENTATION, mesuree
+from projet_csp.portefeuille import resoudre_portefeuille
+from projet_csp.prerequis import GraphePrerequis
+from projet_csp.propagation import PropagationRecherche, propager
+from projet_csp.recherche_locale import RechercheLocale
+from projet_csp.replanification import replanifier
+
 
 @dataclass
 class ExamenCSP:
@@ -21,154 +35,621 @@ class SalleCSP:
     disponibilites: List[tuple]  # [(8,0), (18,0)]
 
 
+def bornes_creneau(creneau: tuple) -> tuple:
+    """(jour, heure_debut, heure_fin) d'un créneau (debut, fin) ou (jour, debut, fin)
+
+    Un créneau ou une disponibilité sans jour vaut pour le jour 0 (ou pour
+    tous les jours, dans le cas d'une disponibilité).
+    """
+    if len(creneau) == 2:
+        return (0,) + tuple(creneau)
+    return tuple(creneau)
+
+
+class ContrainteRessources(Constraint):
+    """Contrainte globale sur les ressources partagées par créneau
+
+    Une seule instance est partagée par tous les examens. Les conflits
+    d'étudiants sont vérifiés sur les voisins de l'examen dans le graphe de
+    conflits, en O(degré) au lieu d'une contrainte binaire par paire.
+
+    Les salles et les enseignants ne font pas partie de la recherche: pour
+    chaque créneau, deux couplages examen -> salle et examen -> enseignant
+    sont maintenus. Une salle est d'abord choisie au meilleur ajustement
+    (la plus petite salle libre assez grande), sinon par chemin augmentant;
+    la contrainte n'échoue (provoquant un retour arrière) que si le créneau
+    ne peut plus accueillir l'examen, ce qui détecte immédiatement un
+    créneau trop plein.
+
+    Les entrées laissées par un retour arrière sont détectées paresseusement:
+    une ressource n'est occupée que si l'examen qui la détient est toujours
+    affecté au même créneau.
+
+    Les valeurs sont les indices des créneaux.
+    """
+
+    def __init__(self, graphe: GrapheConflits,
+                 salles_eligibles: Dict[str, List[int]],
+                 salles_par_creneau: List[Set[int]],
+                 enseignants_eligibles: Dict[str, List[int]], compteurs: Dict[str, int] = None):
+        self.graphe = graphe
+        self.salles_eligibles = salles_eligibles  # examen -> codes salles, capacité croissante
+        self.salles_par_creneau = salles_par_creneau  # creneau -> codes salles disponibles
+        self.enseignants_eligibles = enseignants_eligibles  # examen -> codes enseignants
+        self.occupations = {"salle": {}, "enseignant": {}}  # creneau -> {ressource: examen}
+        self.affectations = {"salle": {}, "enseignant": {}}  # examen -> (creneau, ressource)
+        self.compteurs = compteurs  # évaluations par type, si l'instrumentation est active
+
+    def preProcess(self, variables, domains, constraints, vconstraints):
+        # La contrainte porte sur un seul examen à la fois mais dépend des
+        # autres affectations: elle ne doit pas être appliquée comme unaire.
+        pass
+
+    def __call__(self, variables, domains, assignments, forwardcheck=False):
+        examen = variables[0]
+        creneau = assignments[examen]
+        if self.compteurs is not None:
+            self.compteurs["etudiants"] += 1
+
+        for voisin in self.graphe.voisins(examen):
+            if assignments.get(voisin) == creneau:
+                return False
+
+        return (self._placer("salle", examen, creneau, assignments)
+                and self._placer("enseignant", examen, creneau, assignments))
+
+    def _candidats(self, ressource, examen, creneau):
+        if ressource == "enseignant":
+            return self.enseignants_eligibles[examen]
+        disponibles = self.salles_par_creneau[creneau]
+        return [salle for salle in self.salles_eligibles[examen] if salle in disponibles]
+
+    def _placer(self, ressource, examen, creneau, assignments) -> bool:
+        """Donne à l'examen une ressource libre du créneau, en réorganisant au besoin"""
+        if self.compteurs is not None:
+            self.compteurs[ressource] += 1
+        self._liberer(ressource, examen)
+        occupation = self.occupations[ressource].setdefault(creneau, {})
+        candidats = self._candidats(ressource, examen, creneau)
+
+        for candidat in candidats:
+            occupant = occupation.get(candidat)
+            if occupant is None or assignments.get(occupant) != creneau:
+                occupation[candidat] = examen
+                self.affectations[ressource][examen] = (creneau, candidat)
+                return True
+
+        if self.compteurs is not None:
+            self.compteurs["chemins_augmentants"] += 1
+        return self._augmenter(ressource, examen, creneau, assignments, set())
+
+    def _liberer(self, ressource, examen):
+        affectation = self.affectations[ressource].pop(examen, None)
+        if affectation is not None:
+            creneau, candidat = affectation
+            occupation = self.occupations[ressource][creneau]
+            if occupation.get(candidat) == examen:
+                del occupation[candidat]
+
+    def _augmenter(self, ressource, examen, creneau, assignments, visites) -> bool:
+        """Cherche un chemin augmentant pour donner une ressource à l'examen"""
+        occupation = self.occupations[ressource][creneau]
+        for candidat in self._candidats(ressource, examen, creneau):
+            if candidat in visites:
+                continue
+            visites.add(candidat)
+            occupant = occupation.get(candidat)
+            if (occupant is None
+                    or assignments.get(occupant) != creneau
+                    or self._augmenter(ressource, occupant, creneau, assignments, visites)):
+                occupation[candidat] = examen
+                self.affectations[ressource][examen] = (creneau, candidat)
+                return True
+        return False
+
+
 class PlanificateurCSP:
     """Planificateur d'examens utilisant CSP"""
 
-    def __init__(self):
+    def __init__(self, instrumentation=None):
         self.problem = Problem()
         self.variables = []  # Noms des variables (examens)
         self.domains = {}  # Domaines pour chaque variable
-
-    def creer_creneaux(self, debut: time, fin: time, duree_creneau: int = 2):
-        """Crée les créneaux horaires"""
+        self.graphe = None  # Graphe des conflits entre examens
+        self.creneaux = []  # Créneaux, indexés par leur code
+        self.noms_salles = []  # Noms des salles, indexés par leur code
+        self.noms_enseignants = []  # Noms des enseignants, indexés par leur code
+        self.codes_enseignants = {}  # Nom de l'enseignant -> code
+        self.enseignants_eligibles = {}  # Examen -> codes des enseignants autorisés
+        self.salles_eligibles = {}  # Examen -> codes des salles assez grandes
+        self.salles_par_creneau = []  # Créneau -> codes des salles disponibles
+        self.prerequis = []  # Couples (avant, après) entre examens planifiables
+        self.capacites_salles = []  # Capacités des salles, indexées par leur code
+        self.bornes_creneaux = []  # (jour, debut, fin) de chaque créneau
+        self.dag_prerequis = None  # GraphePrerequis des couples de self.prerequis
+        self.chaines_impossibles = []  # Cycles ou chaînes de prérequis hors session
+        self.reductions = {}  # Examen -> (taille avant, taille après) de son domaine propagé
+        self.domaine_vide = None  # Examen dont la propagation a vidé le domaine
+        self.sans_domaine = {}  # Examen sans aucun créneau possible -> (cause, détail)
+        self.instrumentation = instrumentation or SANS_INSTRUMENTATION  # voir Instrumentation
+
+    def creer_creneaux(self, debut: time, fin: time, duree_creneau: int = 2, jours: int = 1):
+        """Crée les créneaux horaires
+
+        Sur une seule journée, chaque créneau est un couple (debut, fin); sur
+        une session de plusieurs jours, un triplet (jour, debut, fin) avec
+        jour = 0, 1, ...
+        """
         creneaux = []
-        current = debut.hour
-        while current + duree_creneau <= fin.hour:
-            creneaux.append((current, current + duree_creneau))
-            current += duree_creneau
+        for jour in range(jours):
+            current = debut.hour
+            while current + duree_creneau <= fin.hour:
+                if jours == 1:
+                    creneaux.append((current, current + duree_creneau))
+                else:
+                    creneaux.append((jour, current, current + duree_creneau))
+                current += duree_creneau
         return creneaux
 
+    @mesuree("preparer_domaines")
     def preparer_domaines(self, examens: List[ExamenCSP],
                           salles: List[SalleCSP],
                           creneaux: List[tuple]):
-        """Prépare les domaines pour chaque variable"""
-        # Pour chaque examen, créer un domaine de tuples (creneau, salle, enseignant)
+        """Prépare les domaines pour chaque variable
+
+        Chaque valeur du domaine est l'indice d'un créneau. Les salles et
+        les enseignants sont affectés par couplage dans chaque créneau pendant
+        la recherche (voir ContrainteRessources) et ne multiplient donc pas la
+        taille des domaines.
+
+        Un examen sans aucun créneau possible n'est pas une variable; sa
+        cause est notée dans `sans_domaine` avec le détail des chiffres:
+        "enseignant" (aucun surveillant), "capacite" (aucune salle assez
+        grande), "duree" (plus long que tous les créneaux) ou
+        "disponibilite" (aucune salle assez grande libre pendant un créneau
+        assez long).
+        """
+        self.creneaux = list(creneaux)
+        self.bornes_creneaux = [bornes_creneau(creneau) for creneau in self.creneaux]
+        self.noms_salles = [salle.nom for salle in salles]
+        self.capacites_salles = [salle.capacite for salle in salles]
         for examen in examens:
-            domaine = []
+            for enseignant in examen.enseignants:
+                if enseignant not in self.codes_enseignants:
+                    self.codes_enseignants[enseignant] = len(self.noms_enseignants)
+                    self.noms_enseignants.append(enseignant)
+
+        # Salles disponibles pendant chaque créneau (indépendant des examens);
+        # une disponibilité sans jour s'applique à tous les jours de la session
+        self.salles_par_creneau = []
+        for jour, heure_debut, heure_fin in self.bornes_creneaux:
+            disponibles = []
+            for s, salle in enumerate(salles):
+                for dispo in salle.disponibilites:
+                    dispo_jour, dispo_debut, dispo_fin = bornes_creneau(dispo)
+                    if len(dispo) == 3 and dispo_jour != jour:
+                        continue
+                    if heure_debut >= dispo_debut and heure_fin <= dispo_fin:
+                        disponibles.append(s)
+                        break
+            self.salles_par_creneau.append(set(disponibles))
 
-            for creneau in creneaux:
-                heure_debut, heure_fin = creneau
+        # Salles assez grandes pour chaque examen, de la plus petite à la plus grande
+        par_capacite = sorted(range(len(salles)), key=lambda s: salles[s].capacite)
 
+        # Pour chaque examen, créer un domaine de créneaux
+        for examen in examens:
+            domaine = array("l")
+            if not examen.enseignants:
+                self.sans_domaine[examen.nom] = ("enseignant", "aucun enseignant indiqué")
+                continue
+
+            eligibles = [s for s in par_capacite if salles[s].capacite >= len(examen.etudiants)]
+            self.salles_eligibles[examen.nom] = eligibles
+
+            for c, (_, heure_debut, heure_fin) in enumerate(self.bornes_creneaux):
                 # Vérifier si l'examen peut tenir dans le créneau
                 if heure_fin - heure_debut < examen.duree:
                     continue
 
-                for salle in salles:
-                    # Vérifier capacité de la salle
-                    if salle.capacite < len(examen.etudiants):
-                        continue
-
-                    # Vérifier disponibilité de la salle
-                    salle_disponible = False
-                    for dispo in salle.disponibilites:
-                        dispo_debut, dispo_fin = dispo
-                        if heure_debut >= dispo_debut and heure_fin <= dispo_fin:
-                            salle_disponible = True
-                            break
-
-                    if not salle_disponible:
-                        continue
-
-                    for enseignant in examen.enseignants:
-                        domaine.append((creneau, salle.nom, enseignant))
+                # Vérifier qu'une salle assez grande est disponible
+                disponibles = self.salles_par_creneau[c]
+                if any(s in disponibles for s in eligibles):
+                    domaine.append(c)
 
             if domaine:
                 self.variables.append(examen.nom)
                 self.domains[examen.nom] = domaine
+            elif not eligibles:
+                self.sans_domaine[examen.nom] = (
+                    "capacite", f"{len(examen.etudiants)} étudiants, "
+                                f"plus grande salle de {max(self.capacites_salles, default=0)} places")
+            elif all(fin - debut < examen.duree for _, debut, fin in self.bornes_creneaux):
+                plus_long = max((fin - debut for _, debut, fin in self.bornes_creneaux), default=0)
+                self.sans_domaine[examen.nom] = ("duree", f"{examen.duree}h, créneaux de {plus_long}h au plus")
+            else:
+                self.sans_domaine[examen.nom] = (
+                    "disponibilite", f"salles d'au moins {len(examen.etudiants)} places: "
+                                     f"{', '.join(self.noms_salles[s] for s in eligibles)}")
+        self.instrumentation.domaines("preparer_domaines", self.domains)
 
         return self.variables
 
-    def ajouter_contraintes(self, examens: List[ExamenCSP], prerequis: List[tuple] = None):
-        """Ajoute toutes les contraintes au problème CSP"""
-        if prerequis is None:
-            prerequis = []
-
-        # Ajouter les variables avec leurs domaines
-        for var_name in self.variables:
-            self.problem.addVariable(var_name, self.domains[var_name])
-
-        # 1. Contrainte: Pas deux examens dans la même salle au même créneau
-        for i, exam1 in enumerate(examens):
-            for j, exam2 in enumerate(examens):
-                if i < j:
-                    def salle_creneau_conflit(val1, val2, exam1=exam1, exam2=exam2):
-                        creneau1, salle1, _ = val1
-                        creneau2, salle2, _ = val2
-
-                        # Même créneau et même salle = conflit
-                        if creneau1 == creneau2 and salle1 == salle2:
-                            return False
-                        return True
-
-                    self.problem.addConstraint(salle_creneau_conflit, [exam1.nom, exam2.nom])
-
-        # 2. Contrainte: Un enseignant ne peut surveiller qu'un examen à la fois
-        for i, exam1 in enumerate(examens):
-            for j, exam2 in enumerate(examens):
-                if i < j:
-                    def enseignant_conflit(val1, val2, exam1=exam1, exam2=exam2):
-                        creneau1, _, enseignant1 = val1
-                        creneau2, _, enseignant2 = val2
-
-                        # Même enseignant et même créneau = conflit
-                        if creneau1 == creneau2 and enseignant1 == enseignant2:
-                            return False
-                        return True
-
-                    self.problem.addConstraint(enseignant_conflit, [exam1.nom, exam2.nom])
-
-        # 3. Contrainte: Un étudiant ne peut avoir deux examens en même temps
-        for i, exam1 in enumerate(examens):
-            for j, exam2 in enumerate(examens):
-                if i < j:
-                    # Vérifier s'il y a des étudiants en commun
-                    etudiants_communs = set(exam1.etudiants) & set(exam2.etudiants)
-                    if etudiants_communs:
-                        def etudiant_conflit(val1, val2, exam1=exam1, exam2=exam2):
-                            creneau1, _, _ = val1
-                            creneau2, _, _ = val2
-
-                            # Même créneau et étudiants en commun = conflit
-                            if creneau1 == creneau2:
-                                return False
-                            return True
-
-                        self.problem.addConstraint(etudiant_conflit, [exam1.nom, exam2.nom])
-
-        # 4. Contrainte: Vérifier que l'enseignant est dans la liste des enseignants autorisés
-        for examen in examens:
-            def enseignant_autorise(val, examen=examen):
-                _, _, enseignant = val
-                return enseignant in examen.enseignants
+    def encoder_valeur(self, creneau: int, salle: int, enseignant: int) -> int:
+        """Code les indices (creneau, salle, enseignant) d'une solution en un seul entier"""
+        return (creneau * len(self.noms_salles) + salle) * len(self.noms_enseignants) + enseignant
 
-            self.problem.addConstraint(enseignant_autorise, [examen.nom])
+    def indice_creneau(self, code: int) -> int:
+        """Indice du créneau contenu dans un code"""
+        return code // (len(self.noms_salles) * len(self.noms_enseignants))
 
-        # 5. Contraintes de prérequis (ex: Maths doit être avant Programmation)
-        for prerequi in prerequis:
-            examen_avant, examen_apres = prerequi
+    def decoder_valeur(self, code: int) -> tuple:
+        """Décode un entier en triplet (creneau, salle, enseignant) lisible"""
+        reste, enseignant = divmod(code, len(self.noms_enseignants))
+        creneau, salle = divmod(reste, len(self.noms_salles))
+        return self.creneaux[creneau], self.noms_salles[salle], self.noms_enseignants[enseignant]
 
-            # Trouver les objets examens correspondants
-            exam_avant_obj = next((e for e in examens if e.nom == examen_avant), None)
-            exam_apres_obj = next((e for e in examens if e.nom == examen_apres), None)
+    def decoder_solution(self, solution: Dict) -> Dict:
+        """Décode une solution {examen: code} en {examen: (creneau, salle, enseignant)}"""
+        return {examen: self.decoder_valeur(code) for examen, code in solution.items()}
 
-            if exam_avant_obj and exam_apres_obj:
-                def contrainte_prerequis(val_avant, val_apres):
-                    creneau_avant, _, _ = val_avant
-                    creneau_apres, _, _ = val_apres
+    @mesuree("ajouter_contraintes")
+    def ajouter_contraintes(self, examens: List[ExamenCSP], prerequis: List[tuple] = None,
+                            index_etudiants: Dict[str, List[str]] = None):
+        """Ajoute toutes les contraintes au problème CSP
 
-                    # L'examen "avant" doit finir avant ou au moment où l'examen "après" commence
-                    heure_fin_avant = creneau_avant[1]  # heure de fin du créneau avant
-                    heure_debut_apres = creneau_apres[0]  # heure de début du créneau après
-
-                    return heure_fin_avant <= heure_debut_apres
+        `index_etudiants` (étudiant -> examens), s'il est déjà connu, évite de
+        le reconstruire (voir `chargement.charger_session`).
+        """
+        if prerequis is None:
+            prerequis = []
 
-                self.problem.addConstraint(contrainte_prerequis, [examen_avant, examen_apres])
-                print(f"Contrainte ajoutée: {examen_avant} avant {examen_apres}")
+        # 5. Prérequis (ex: Maths doit être avant Programmation), compilés en
+        # graphe orienté: les chaînes bornent les domaines avant la recherche
+        noms = {examen.nom for examen in examens}
+        for examen_avant, examen_apres in prerequis:
+            if (examen_avant in noms and examen_apres in noms
+                    and examen_avant in self.domains and examen_apres in self.domains):
+                self.prerequis.append((examen_avant, examen_apres))
+        self.dag_prerequis = GraphePrerequis(self.prerequis)
+        self._borner_par_prerequis()
+
+        # 1-4. Contraintes de salle, d'enseignant et d'étudiants: un moteur global
+        # couple les examens de chaque créneau avec les salles et les enseignants
+        # autorisés, et lit les conflits d'étudiants dans le graphe de conflits
+        with self.instrumentation.phase("graphe_conflits"):
+            self.graphe = GrapheConflits(examens, index_etudiants)
+        self.enseignants_eligibles = {
+            examen.nom: [self.codes_enseignants[e] for e in dict.fromkeys(examen.enseignants)]
+            for examen in examens if examen.nom in self.domains
+        }
+        self._propager()
 
-    def resoudre(self):
-        """Résout le problème CSP"""
-        solutions = self.problem.getSolutions()
-        return solutions
+        # Ajouter les variables avec leurs domaines
+        for var_name in self.variables:
+            self.problem.addVariable(var_name, self.domains[var_name])
+        self._ajouter_moteur()
+
+        for examen_avant, examen_apres in self.prerequis:
+            self.problem.addConstraint(self._contrainte_precede(), [examen_avant, examen_apres])
+            print(f"Contrainte ajoutée: {examen_avant} avant {examen_apres}")
+
+    @mesuree("prerequis")
+    def _borner_par_prerequis(self):
+        """Réduit les domaines selon les chaînes de prérequis et signale celles
+        qui ne tiennent pas dans la session (les domaines restent alors intacts,
+        le problème n'ayant pas de solution)"""
+        cycle = self.dag_prerequis.cycle()
+        if cycle:
+            print(f"Cycle de prérequis: {' > '.join(cycle)}")
+            self.chaines_impossibles = [cycle]
+            return
+
+        reduits, self.chaines_impossibles = self.dag_prerequis.bornes(self.domains, self.bornes_creneaux)
+        for chaine in self.chaines_impossibles:
+            print(f"Chaîne de prérequis trop longue pour la session: {' > '.join(chaine)}")
+        if self.chaines_impossibles:
+            return
+
+        retires = 0
+        for examen, domaine in reduits.items():
+            retires += len(self.domains[examen]) - len(domaine)
+            self.domains[examen] = domaine
+        self.instrumentation.domaines("prerequis", self.domains)
+        if retires:
+            print(f"Prérequis: {retires} créneau(x) retiré(s) des domaines avant la recherche")
+
+    @mesuree("propagation")
+    def _propager(self):
+        """Réduit les domaines par propagation avant la recherche (voir
+        Propagation) et affiche de combien chacun a rétréci; si un domaine se
+        vide, le problème n'a pas de solution et les domaines restent intacts"""
+        if self.chaines_impossibles:
+            return
+        reduits, vide = propager(self)
+        if vide is not None:
+            print(f"Propagation: plus aucun créneau possible pour {vide}")
+            self.domaine_vide = vide
+            return
+
+        for var_name, domaine in reduits.items():
+            avant = len(self.domains[var_name])
+            if len(domaine) < avant:
+                self.reductions[var_name] = (avant, len(domaine))
+            self.domains[var_name] = domaine
+        self.instrumentation.domaines("propagation", self.domains)
+        if self.reductions:
+            retirees = sum(avant - apres for avant, apres in self.reductions.values())
+            print(f"Propagation: {retirees} créneau(x) retiré(s) sur "
+                  f"{len(self.reductions)} examen(s)")
+            plus_reduits = sorted(self.reductions.items(), key=lambda r: r[1][1] - r[1][0])
+            for var_name, (avant, apres) in plus_reduits[:10]:
+                print(f"  {var_name}: {avant} -> {apres} créneau(x)")
+
+    def _ajouter_moteur(self):
+        moteur = ContrainteRessources(self.graphe, self.salles_eligibles, self.salles_par_creneau,
+                                      self.enseignants_eligibles, self.instrumentation.compteurs)
+        for var_name in self.variables:
+            self.problem.addConstraint(moteur, [var_name])
+
+    def sous_probleme(self, examens: List[str], index_etudiants: Dict[str, List[str]] = None,
+                      domaines: Dict[str, List[int]] = None) -> "PlanificateurCSP":
+        """Planificateur restreint à un sous-ensemble des examens planifiables
+
+        Créneaux, salles et enseignants (donc les codes des solutions) sont
+        partagés avec ce planificateur; seules les contraintes entre examens
+        du sous-ensemble sont reprises. `index_etudiants` est transmis à
+        `GrapheConflits.sous_graphe`; `domaines` remplace le domaine de
+        certains examens (par exemple un seul créneau pour les figer).
+        """
+        retenus = set(examens)
+        sous = PlanificateurCSP(self.instrumentation)
+        sous.creneaux = self.creneaux
+        sous.bornes_creneaux = self.bornes_creneaux
+        sous.noms_salles = self.noms_salles
+        sous.capacites_salles = self.capacites_salles
+        sous.salles_par_creneau = self.salles_par_creneau
+        sous.noms_enseignants = self.noms_enseignants
+        sous.codes_enseignants = self.codes_enseignants
+
+        sous.variables = [e for e in self.variables if e in retenus]
+        if domaines is None:
+            domaines = {}
+        for var_name in sous.variables:
+            sous.domains[var_name] = domaines.get(var_name, self.domains[var_name])
+            sous.salles_eligibles[var_name] = self.salles_eligibles[var_name]
+            sous.enseignants_eligibles[var_name] = self.enseignants_eligibles[var_name]
+        sous.graphe = self.graphe.sous_graphe(sous.variables, index_etudiants)
+        sous.prerequis = [(avant, apres) for avant, apres in self.prerequis
+                          if avant in retenus and apres in retenus]
+        if domaines:
+            # Les examens figés réduisent les domaines des autres dès le départ
+            reduits, vide = propager(sous)
+            if vide is None:
+                sous.domains.update(reduits)
+        sous.construire_probleme()
+        return sous
+
+    @mesuree("construire_probleme")
+    def construire_probleme(self):
+        """(Re)crée le problème python-constraint à partir des domaines, du
+        graphe de conflits et des prérequis déjà calculés"""
+        self.problem = Problem()
+        for var_name in self.variables:
+            self.problem.addVariable(var_name, self.domains[var_name])
+        self._ajouter_moteur()
+        for examen_avant, examen_apres in self.prerequis:
+            self.problem.addConstraint(self._contrainte_precede(), [examen_avant, examen_apres])
+
+    def _contrainte_precede(self):
+        """Fonction de la contrainte de prérequis, comptée si l'instrumentation est active"""
+        return self._creneau_precede_compte if self.instrumentation.actif else self.creneau_precede
+
+    def _creneau_precede_compte(self, creneau_avant: int, creneau_apres: int) -> bool:
+        self.instrumentation.compter("prerequis")
+        return self.creneau_precede(creneau_avant, creneau_apres)
+
+    def creneau_precede(self, creneau_avant: int, creneau_apres: int) -> bool:
+        """Vrai si le premier créneau finit avant ou au moment où le second commence"""
+        jour_avant, _, heure_fin_avant = self.bornes_creneaux[creneau_avant]
+        jour_apres, heure_debut_apres, _ = self.bornes_creneaux[creneau_apres]
+        return (jour_avant, heure_fin_avant) <= (jour_apres, heure_debut_apres)
+
+    @mesuree("resolution")
+    def resoudre(self, mode: str = "all", limit: int = None,
+                 ordre: str = None, depart: Dict = None, arret=None, progression=None):
+        """Résout le problème CSP
+
+        - mode="first": renvoie la première solution trouvée (ou None)
+        - mode="iter": renvoie un générateur qui produit les solutions à la demande
+        - mode="all": renvoie la liste des solutions (au plus `limit`)
+
+        `ordre` ("dsatur" ou "degre") et `depart` ({examen: créneau}, voir
+        `coloration_initiale`) activent le solveur guidé par le graphe de
+        conflits, qui propage enseignants, salles et prérequis après chaque
+        affectation (voir PropagationRecherche); sinon le solveur par défaut
+        de python-constraint est utilisé. `arret` et `progression` (voir SolveurHeuristique) permettent de
+        suivre et d'interrompre ce solveur.
+        """
+        if ordre is not None or depart is not None or arret is not None or progression is not None:
+            self.problem.setSolver(SolveurHeuristique(self.graphe, ordre=ordre or "dsatur", depart=depart,
+                                                      arret=arret, progression=progression,
+                                                      propagation=PropagationRecherche(self)))
+
+        if mode == "first":
+            solution = self.problem.getSolution()
+            self._compter_recherche()
+            return self._completer_solution(solution) if solution else solution
+        if mode == "iter":
+            return self._iterer_solutions(limit)
+        if mode == "all":
+            return list(self._iterer_solutions(limit))
+        raise ValueError(f"Mode de résolution inconnu: {mode}")
+
+    def _iterer_solutions(self, limit: int = None):
+        """Parcourt paresseusement les solutions du solveur"""
+        solutions = self.problem.getSolutionIter()
+        if limit is not None:
+            solutions = islice(solutions, limit)
+        for solution in solutions:
+            yield self._completer_solution(solution)
+        self._compter_recherche()
+
+    def _compter_recherche(self):
+        """Reporte les noeuds et retours arrière du solveur guidé dans l'instrumentation"""
+        solveur = self.problem.getSolver()
+        if isinstance(solveur, SolveurHeuristique):
+            self.instrumentation.compter("noeuds", solveur.noeuds)
+            self.instrumentation.compter("retours_arriere", solveur.retours)
+            if solveur.propagation is not None:
+                self.instrumentation.compter("retraits_propagation", solveur.propagation.retraits)
+
+    @mesuree("coloration_initiale")
+    def coloration_initiale(self) -> Dict:
+        """Planning de départ obtenu par coloration gloutonne DSatur
+
+        Renvoie {examen: créneau} en respectant les conflits d'étudiants et le
+        nombre de salles disponibles par créneau; les examens qui n'ont pas
+        pu être placés sont absents.
+        """
+        capacites = {c: len(salles) for c, salles in enumerate(self.salles_par_creneau)}
+        return coloration_dsatur(self.graphe, self.domains, capacites)
+
+    @mesuree("recherche_locale")
+    def optimiser(self, temps_limite: float = 10.0, graine: int = None, objectif=None,
+                  arret=None, progression=None):
+        """Recherche locale bornée dans le temps, pour les sessions trop grandes
+        pour le retour arrière exact
+
+        Renvoie (solution, nb_violations): le meilleur planning trouvé, sous
+        forme de codes complets, et le nombre de contraintes qu'il viole.
+        Avec un `objectif` (voir ObjectifSouple), le temps restant après
+        l'élimination des violations sert à réduire le coût des préférences.
+        `arret` et `progression`: voir `RechercheLocale.optimiser`.
+        """
+        return RechercheLocale(self, graine, objectif).optimiser(temps_limite, arret=arret,
+                                                                 progression=progression)
+
+    @mesuree("portefeuille")
+    def resoudre_portefeuille(self, temps_limite: float = 60.0, max_workers: int = None,
+                              premier: bool = True, objectif=None, configurations=None):
+        """Résolution en parallèle par un portefeuille de solveurs
+
+        Voir `portefeuille.resoudre_portefeuille`; renvoie le meilleur
+        ResultatPortefeuille (configuration, solution, violations, coût).
+        """
+        return resoudre_portefeuille(self, configurations, temps_limite, max_workers, premier, objectif)
+
+    @mesuree("composantes")
+    def resoudre_par_composantes(self, temps_limite: float = 60.0, max_workers: int = None,
+                                 configuration=None):
+        """Résolution en parallèle des groupes d'examens indépendants
+
+        Voir `decomposition.resoudre_par_composantes`; renvoie (solution,
+        nb_violations, infaisable).
+        """
+        return resoudre_par_composantes(self, configuration, temps_limite, max_workers)
+
+    @mesuree("diagnostic")
+    def diagnostiquer(self):
+        """Conditions nécessaires violées (voir `diagnostic.conditions_necessaires`):
+        une liste non vide prouve, sans recherche, qu'il n'y a pas de solution"""
+        return conditions_necessaires(self)
+
+    @mesuree("noyau_insatisfiable")
+    def noyau_insatisfiable(self, temps_limite: float = 30.0):
+        """Examens et contraintes d'un sous-ensemble minimal sans solution
+
+        Voir `diagnostic.noyau_insatisfiable`; renvoie une Incoherence, ou
+        None si l'absence de solution n'a pu être prouvée dans le temps.
+        """
+        return noyau_insatisfiable(self, temps_limite)
+
+    @mesuree("replanification")
+    def replanifier(self, ancienne_solution: Dict, temps_limite: float = 10.0):
+        """Répare un planning publié après modification des données, en
+        déplaçant le moins d'examens possible
+
+        Voir `replanification.replanifier`; renvoie (solution, nb_violations,
+        examens déplacés).
+        """
+        return replanifier(self, ancienne_solution, temps_limite)
+
+    @mesuree("affectation")
+    def completer_affectation(self, affectation: Dict, preferences: Dict[str, tuple] = None):
+        """Affecte les salles et les surveillants d'un planning {examen: créneau}
+
+        Les salles sont choisies au meilleur ajustement et les surveillants par
+        couplage, créneau par créneau. Renvoie (solution, nb_non_places): la
+        solution en codes complets (voir `encoder_valeur`) et le nombre de
+        salles ou surveillants qui n'ont pas pu être attribués; les examens
+        concernés reçoivent alors leur première salle et leur premier
+        enseignant autorisés, en conflit.
+
+        `preferences` ({examen: (code salle, code enseignant)}) fait essayer
+        en premier la salle et le surveillant indiqués, par exemple ceux d'un
+        planning déjà publié; ces examens sont servis avant les autres.
+        """
+        if preferences is None:
+            preferences = {}
+        par_creneau = {}
+        for examen, creneau in affectation.items():
+            par_creneau.setdefault(creneau, []).append(examen)
+
+        complete = {}
+        non_places = 0
+        for creneau, examens in par_creneau.items():
+            disponibles = self.salles_par_creneau[creneau]
+            candidates = {e: [s for s in self.salles_eligibles[e] if s in disponibles] for e in examens}
+            surveillants = {e: self.enseignants_eligibles[e] for e in examens}
+            gardent_salle = set()
+            for examen in examens:
+                if examen in preferences:
+                    salle, enseignant = preferences[examen]
+                    if salle in candidates[examen]:
+                        gardent_salle.add(examen)
+                        candidates[examen] = en_premier(candidates[examen], salle)
+                    surveillants[examen] = en_premier(surveillants[examen], enseignant)
+
+            # Les examens qui gardent leur salle, puis les plus gros (le moins de
+            # salles possibles), choisissent en premier
+            examens.sort(key=lambda e: (e not in gardent_salle, len(self.salles_eligibles[e])))
+            salles = meilleur_ajustement({e: candidates[e] for e in examens})
+            enseignants = hopcroft_karp(surveillants)
+            non_places += 2 * len(examens) - len(salles) - len(enseignants)
+            for examen in examens:
+                salle = salles.get(examen, (candidates[examen] or self.salles_eligibles[examen])[0])
+                enseignant = enseignants.get(examen, self.enseignants_eligibles[examen][0])
+                complete[examen] = self.encoder_valeur(creneau, salle, enseignant)
+        return complete, non_places
+
+    def _completer_solution(self, solution: Dict) -> Dict:
+        """Affecte les salles et les surveillants d'une solution trouvée par le solveur"""
+        complete, non_places = self.completer_affectation(solution)
+        if non_places:
+            raise RuntimeError("Ressources insuffisantes pour compléter la solution")
+        return complete
+
+    def lignes_solution(self, solution: Dict, examens: List[ExamenCSP]) -> List[Dict]:
+        """Une ligne par examen, triées par jour et heure de début: examen, jour
+        (None sur une seule journée), heure_debut, heure_fin, salle, enseignant,
+        duree (None si l'examen n'est pas dans `examens`)"""
+        examens_par_nom = {e.nom: e for e in examens}
+        lignes = []
+        for examen_nom, (creneau, salle, enseignant) in self.decoder_solution(solution).items():
+            jour, heure_debut, heure_fin = bornes_creneau(creneau)
+            examen_obj = examens_par_nom.get(examen_nom)
+            lignes.append({
+                "examen": examen_nom,
+                "jour": jour + 1 if len(creneau) == 3 else None,
+                "heure_debut": heure_debut,
+                "heure_fin": heure_fin,
+                "salle": salle,
+                "enseignant": enseignant,
+                "duree": examen_obj.duree if examen_obj else None,
+            })
+        lignes.sort(key=lambda ligne: (ligne["jour"] or 0, ligne["heure_debut"], ligne["heure_fin"]))
+        return lignes
 
     def afficher_solution(self, solution: Dict, examens: List[ExamenCSP]):
         """Affiche une solution"""
@@ -176,21 +657,17 @@ class PlanificateurCSP:
         print("SOLUTION CSP - PLANNING DES EXAMENS")
         print("=" * 60)
 
-        # Trier par créneau
-        sorted_items = sorted(solution.items(),
-                              key=lambda x: x[1][0][0])  # tri par heure de début
-
-        for examen_nom, (creneau, salle, enseignant) in sorted_items:
-            heure_debut, heure_fin = creneau
-            print(f"\n{examen_nom.upper()}")
-            print(f"  Heure: {heure_debut:02d}:00 - {heure_fin:02d}:00")
-            print(f"  Salle: {salle}")
-            print(f"  Enseignant: {enseignant}")
+        for ligne in self.lignes_solution(solution, examens):
+            print(f"\n{ligne['examen'].upper()}")
+            if ligne["jour"] is not None:
+                print(f"  Jour: {ligne['jour']}")
+            print(f"  Heure: {ligne['heure_debut']:02d}:00 - {ligne['heure_fin']:02d}:00")
+            print(f"  Salle: {ligne['salle']}")
+            print(f"  Enseignant: {ligne['enseignant']}")
 
             # Afficher les informations supplémentaires
-            examen_obj = next((e for e in examens if e.nom == examen_nom), None)
-            if examen_obj:
-                print(f"  Durée: {examen_obj.duree}h")
+            if ligne["duree"] is not None:
+                print(f"  Durée: {ligne['duree']}h")
 
 
             print("-" * 40)
@@ -253,24 +730,25 @@ def exemple_utilisation_csp():
     print("\nAjout des contraintes...")
     planificateur.ajouter_contraintes(examens, prerequis)
 
-    # Résoudre le problème
+    # Résoudre le problème (les solutions sont produites à la demande)
     print("\nRecherche de solutions CSP...")
-    solutions = planificateur.resoudre()
+    solutions = planificateur.resoudre(mode="iter")
+    solution = next(solutions, None)
 
-    if solutions:
-        print(f"\n✅ {len(solutions)} solution(s) trouvée(s)")
+    if solution:
+        print("\n✅ Solution trouvée")
 
         # Afficher la première solution
-        planificateur.afficher_solution(solutions[0], examens)
+        planificateur.afficher_solution(solution, examens)
 
         # Vérifier que la contrainte de prérequis est respectée
         print("\n" + "=" * 60)
         print("VÉRIFICATION DES PRÉREQUIS")
         print("=" * 60)
 
-        solution = solutions[0]
-        creneau_maths = solution["Maths"][0]
-        creneau_prog = solution["Programmation"][0]
+        planning = planificateur.decoder_solution(solution)
+        creneau_maths = planning["Maths"][0]
+        creneau_prog = planning["Programmation"][0]
 
         print(f"Maths: {creneau_maths[0]:02d}:00-{creneau_maths[1]:02d}:00")
         print(f"Programmation: {creneau_prog[0]:02d}:00-{creneau_prog[1]:02d}:00")
@@ -281,14 +759,25 @@ def exemple_utilisation_csp():
             print("❌ ERREUR: Contrainte non respectée!")
 
         # Option: afficher d'autres solutions
-        if len(solutions) > 1:
-            print(f"\nAutres solutions disponibles ({len(solutions) - 1} au total)")
+        autre_solution = next(solutions, None)
+        if autre_solution:
+            print("\nD'autres solutions sont disponibles")
             reponse = input("Voulez-vous voir une autre solution? (o/n): ")
             if reponse.lower() == 'o':
-                planificateur.afficher_solution(solutions[1], examens)
+                planificateur.afficher_solution(autre_solution, examens)
     else:
         print("\n❌ Aucune solution trouvée avec les contraintes actuelles")
 
+        # Ce qui empêche toute solution: conditions nécessaires, sinon noyau minimal
+        incoherences = planificateur.diagnostiquer()
+        if not incoherences:
+            noyau = planificateur.noyau_insatisfiable()
+            incoherences = [noyau] if noyau is not None else []
+        for incoherence in incoherences:
+            print(f"\n{incoherence.message}")
+            for contrainte in incoherence.contraintes:
+                print(f"  - {contrainte}")
+
         # Suggestions pour relâcher les contraintes
         print("\nSuggestions:")
         print("1. Ajouter plus de salles")
@@ -330,19 +819,21 @@ def exemple_avec_plusieurs_prerequis():
     planificateur.preparer_domaines(examens, salles, creneaux)
     planificateur.ajouter_contraintes(examens, prerequis)
 
-    solutions = planificateur.resoudre()
+    # Recherche guidée par le graphe de conflits, à partir d'une coloration gloutonne
+    depart = planificateur.coloration_initiale()
+    solution = planificateur.resoudre(mode="first", ordre="dsatur", depart=depart)
 
-    if solutions:
-        print(f"✅ {len(solutions)} solution(s) avec prérequis multiples")
-        planificateur.afficher_solution(solutions[0], examens)
+    if solution:
+        print("✅ Solution trouvée avec prérequis multiples")
+        planificateur.afficher_solution(solution, examens)
 
         # Vérification des prérequis
-        solution = solutions[0]
+        planning = planificateur.decoder_solution(solution)
         print("\nVérification des prérequis:")
 
         for avant, apres in prerequis:
-            creneau_avant = solution[avant][0]
-            creneau_apres = solution[apres][0]
+            creneau_avant = planning[avant][0]
+            creneau_apres = planning[apres][0]
 
             if creneau_avant[1] <= creneau_apres[0]:
                 print(f"✅ {avant} ({creneau_avant[0]:02d}:00) avant {apres} ({creneau_apres[0]:02d}:00)")
@@ -392,21 +883,10 @@ def main_csp():
     planificateur2 = PlanificateurCSP()
     creneaux2 = planificateur2.creer_creneaux(time(8, 0), time(18, 0), 2)
 
-    # Ajouter une contrainte supplémentaire: l'amphi ne peut pas être utilisé après 12h
-    def contrainte_amphi_matin(val):
-        creneau, salle, _ = val
-        heure_debut, _ = creneau
-        if salle == "Amphi" and heure_debut >= 12:
-            return False
-        return True
-
-    for examen in examens_supp:
-        planificateur2.problem.addVariable(examen.nom,
-                                           [(c, s.nom, e)
-                                            for c in creneaux2
-                                            for s in salles_supp
-                                            for e in examen.enseignants])
-        planificateur2.problem.addConstraint(contrainte_amphi_matin, [examen.nom])
+    # La contrainte "amphi seulement le matin" est portée par les disponibilités
+    # de la salle: les créneaux de l'après-midi sont exclus des domaines
+    planificateur2.preparer_domaines(examens_supp, salles_supp, creneaux2)
+    planificateur2.ajouter_contraintes(examens_supp)
 
     print("\nAvec contraintes supplémentaires (amphi seulement le matin)...")
     solutions2 = planificateur2.resoudre()
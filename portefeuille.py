@@ -0,0 +1,150 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List
+
+if TYPE_CHECKING:
+    from projet_csp.objectif import ObjectifSouple
+    from projet_csp.planification import PlanificateurCSP
+
+
+@dataclass
+class ConfigurationSolveur:
+    """Une configuration du portefeuille
+
+    - moteur="retour_arriere": SolveurHeuristique avec l'ordre des variables
+      `ordre` ("dsatur" ou "degre"), partant de la coloration DSatur si `depart`;
+    - moteur="recuit": RechercheLocale avec la graine `graine`.
+    """
+    moteur: str = "recuit"
+    ordre: str = "dsatur"
+    graine: int = None
+    depart: bool = True
+
+    @property
+    def nom(self) -> str:
+        if self.moteur == "recuit":
+            return f"recuit (graine {self.graine})"
+        return f"retour arrière ({self.ordre})"
+
+
+@dataclass
+class ResultatPortefeuille:
+    """Résultat d'une configuration: `solution` en codes complets, ou None
+
+    `violations` vaut None si aucune solution n'a été produite; `infaisable`
+    indique que le retour arrière a épuisé l'espace de recherche.
+    """
+    configuration: ConfigurationSolveur
+    solution: Dict[str, int]
+    violations: int
+    cout: int
+    duree: float
+    infaisable: bool = False
+
+    def cle(self) -> tuple:
+        """Clé de comparaison: moins de violations, puis coût le plus bas"""
+        if self.violations is None:
+            return float("inf"), 0
+        return self.violations, self.cout
+
+
+def configurations_par_defaut(nombre: int) -> List[ConfigurationSolveur]:
+    """`nombre` configurations variées: recuits de graines différentes et
+    retour arrière avec les deux ordres de variables"""
+    configurations = [
+        ConfigurationSolveur("recuit", graine=0),
+        ConfigurationSolveur("retour_arriere", ordre="dsatur"),
+        ConfigurationSolveur("retour_arriere", ordre="degre"),
+    ]
+    configurations += [ConfigurationSolveur("recuit", graine=g) for g in range(1, nombre - 2)]
+    return configurations[:max(nombre, 1)]
+
+
+def executer_configuration(planificateur: "PlanificateurCSP", configuration: ConfigurationSolveur,
+              temps_limite: float, arret, objectif: "ObjectifSouple") -> ResultatPortefeuille:
+    """Exécute une configuration dans un processus du portefeuille"""
+    debut = time.perf_counter()
+    infaisable = False
+
+    if configuration.moteur == "recuit":
+        solution, violations = planificateur.optimiser(temps_limite, configuration.graine, objectif, arret)
+    elif configuration.moteur == "retour_arriere":
+        depart = planificateur.coloration_initiale() if configuration.depart else None
+        solution = planificateur.resoudre(mode="first", ordre=configuration.ordre, depart=depart, arret=arret)
+        violations = 0 if solution is not None else None
+        infaisable = solution is None and not arret.is_set()
+    else:
+        raise ValueError(f"Moteur inconnu: {configuration.moteur}")
+
+    cout = 0
+    if objectif is not None and solution is not None:
+        cout = objectif.evaluer_solution(planificateur, solution)
+    return ResultatPortefeuille(configuration, solution, violations, cout,
+                                time.perf_counter() - debut, infaisable)
+
+
+def resoudre_portefeuille(planificateur: "PlanificateurCSP",
+                          configurations: List[ConfigurationSolveur] = None,
+                          temps_limite: float = 60.0,
+                          max_workers: int = None,
+                          premier: bool = True,
+                          objectif: "ObjectifSouple" = None) -> ResultatPortefeuille:
+    """Lance plusieurs configurations en parallèle, une par processus
+
+    Avec `premier`, la recherche s'arrête dès qu'une configuration produit
+    un planning sans violation; sinon toutes tournent jusqu'à `temps_limite`
+    et le meilleur planning (violations, puis coût de l'objectif) est gardé.
+    Une preuve d'infaisabilité par le retour arrière arrête aussi tout.
+    Les autres configurations sont alors interrompues par un événement
+    partagé, consulté régulièrement par les deux moteurs.
+
+    Renvoie le meilleur ResultatPortefeuille; sa solution est None si aucune
+    configuration n'a produit de planning. Une preuve d'infaisabilité est
+    renvoyée en priorité, quel que soit le nombre de violations des
+    plannings produits par ailleurs.
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if configurations is None:
+        configurations = configurations_par_defaut(max_workers)
+
+    meilleur = preuve = None
+    with multiprocessing.Manager() as gestionnaire, \
+            ProcessPoolExecutor(max_workers=min(max_workers, len(configurations))) as executeur:
+        arret = gestionnaire.Event()
+        en_cours = {
+            executeur.submit(executer_configuration, planificateur, configuration, temps_limite, arret, objectif)
+            for configuration in configurations
+        }
+        fin = time.perf_counter() + temps_limite
+
+        while en_cours:
+            restant = fin - time.perf_counter()
+            if restant <= 0 and not arret.is_set():
+                arret.set()
+            if arret.is_set():
+                for future in en_cours:
+                    future.cancel()  # configurations pas encore démarrées
+            termines, en_cours = wait(en_cours, timeout=None if arret.is_set() else restant,
+                                      return_when=FIRST_COMPLETED)
+
+            for future in termines:
+                if future.cancelled():
+                    continue
+                resultat = future.result()
+                print(f"Portefeuille: {resultat.configuration.nom} -> "
+                      f"{resultat.violations if resultat.violations is not None else '-'} violation(s) "
+                      f"en {resultat.duree:.2f}s")
+                if meilleur is None or resultat.cle() < meilleur.cle():
+                    meilleur = resultat
+                if resultat.infaisable:
+                    preuve = preuve or resultat
+                    print(f"Portefeuille: {resultat.configuration.nom} prouve qu'il n'existe pas de solution")
+                    arret.set()
+                elif premier and resultat.violations == 0:
+                    arret.set()
+
+    return preuve or meilleur
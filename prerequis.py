@@ -0,0 +1,132 @@
+from array import array
+from typing import Dict, List, Sequence, Tuple
+
+
+class GraphePrerequis:
+    """Graphe orienté des prérequis (avant -> après)
+
+    Sert à détecter les cycles et à borner, avant la recherche, les créneaux
+    de chaque examen: un examen ne peut pas commencer avant la fin la plus
+    précoce de ses prérequis, ni finir après le début le plus tardif des
+    examens qui en dépendent.
+    """
+
+    def __init__(self, couples: Sequence[Tuple[str, str]]):
+        self.successeurs: Dict[str, List[str]] = {}
+        self.predecesseurs: Dict[str, List[str]] = {}
+        for avant, apres in couples:
+            self.successeurs.setdefault(avant, []).append(apres)
+            self.predecesseurs.setdefault(apres, []).append(avant)
+            self.successeurs.setdefault(apres, [])
+            self.predecesseurs.setdefault(avant, [])
+
+    def ordre_topologique(self) -> List[str]:
+        """Examens triés de sorte que chacun suive ses prérequis (algorithme
+        de Kahn); None si le graphe contient un cycle"""
+        entrants = {examen: len(avants) for examen, avants in self.predecesseurs.items()}
+        pile = [examen for examen, n in entrants.items() if n == 0]
+        ordre = []
+        while pile:
+            examen = pile.pop()
+            ordre.append(examen)
+            for apres in self.successeurs[examen]:
+                entrants[apres] -= 1
+                if entrants[apres] == 0:
+                    pile.append(apres)
+        return ordre if len(ordre) == len(entrants) else None
+
+    def cycle(self) -> List[str]:
+        """Un cycle de prérequis [A, B, ..., A], ou [] s'il n'y en a pas"""
+        etat = {}  # examen -> 1 en cours de visite, 2 terminé
+        for depart in self.successeurs:
+            if depart in etat:
+                continue
+            chemin = [depart]
+            iterateurs = [iter(self.successeurs[depart])]
+            etat[depart] = 1
+            while iterateurs:
+                suivant = next(iterateurs[-1], None)
+                if suivant is None:
+                    etat[chemin.pop()] = 2
+                    iterateurs.pop()
+                elif etat.get(suivant) == 1:
+                    return chemin[chemin.index(suivant):] + [suivant]
+                elif suivant not in etat:
+                    etat[suivant] = 1
+                    chemin.append(suivant)
+                    iterateurs.append(iter(self.successeurs[suivant]))
+        return []
+
+    def bornes(self, domaines: Dict[str, Sequence[int]], bornes_creneaux: List[tuple]):
+        """Réduit les domaines aux créneaux compatibles avec les chaînes de prérequis
+
+        Deux passes de plus long chemin sur l'ordre topologique: en avant, la
+        fin au plus tôt de chaque examen; en arrière, le début au plus tard.
+        `bornes_creneaux` donne (jour, debut, fin) de chaque créneau.
+
+        Renvoie (domaines réduits, chaînes impossibles): les domaines sont des
+        array("l") pour les seuls examens du graphe; chaque chaîne impossible
+        est la liste des examens d'une chaîne qui ne tient pas dans la session.
+        Lève ValueError si le graphe contient un cycle.
+        """
+        ordre = self.ordre_topologique()
+        if ordre is None:
+            raise ValueError("Cycle de prérequis: " + " > ".join(self.cycle()))
+
+        def debut(c):
+            jour, heure_debut, _ = bornes_creneaux[c]
+            return jour, heure_debut
+
+        def fin(c):
+            jour, _, heure_fin = bornes_creneaux[c]
+            return jour, heure_fin
+
+        # En avant: créneaux qui commencent après la fin au plus tôt des prérequis
+        reduits, fin_au_plus_tot, origine = {}, {}, {}
+        impossibles = []
+        for examen in ordre:
+            limite, origine[examen] = None, None
+            for avant in self.predecesseurs[examen]:
+                if avant in fin_au_plus_tot and (limite is None or fin_au_plus_tot[avant] > limite):
+                    limite, origine[examen] = fin_au_plus_tot[avant], avant
+            valeurs = [c for c in domaines[examen] if limite is None or debut(c) >= limite]
+            if not valeurs:
+                impossibles.append(self._chaine(examen, origine))
+                continue
+            reduits[examen] = valeurs
+            fin_au_plus_tot[examen] = min(fin(c) for c in valeurs)
+
+        # En arrière: créneaux qui finissent avant le début au plus tard des suivants
+        debut_au_plus_tard = {}
+        for examen in reversed(ordre):
+            if examen not in reduits:
+                continue
+            limite = min((debut_au_plus_tard[apres] for apres in self.successeurs[examen]
+                          if apres in debut_au_plus_tard), default=None)
+            valeurs = [c for c in reduits[examen] if limite is None or fin(c) <= limite]
+            if not valeurs:
+                impossibles.append(self._chaine(examen, origine) + self._suite(examen, debut_au_plus_tard))
+                del reduits[examen]
+                continue
+            reduits[examen] = array("l", valeurs)
+            debut_au_plus_tard[examen] = max(debut(c) for c in valeurs)
+
+        return reduits, impossibles
+
+    def _chaine(self, examen: str, origine: Dict[str, str]) -> List[str]:
+        """Chaîne de prérequis qui fixe la fin au plus tôt, jusqu'à l'examen"""
+        chaine = [examen]
+        while origine.get(chaine[-1]) is not None:
+            chaine.append(origine[chaine[-1]])
+        return chaine[::-1]
+
+    def _suite(self, examen: str, debut_au_plus_tard: Dict) -> List[str]:
+        """Suivants qui fixent le début au plus tard, après l'examen"""
+        suite = []
+        courant = examen
+        while True:
+            suivants = [s for s in self.successeurs[courant] if s in debut_au_plus_tard]
+            if not suivants:
+                return suite
+            courant = min(suivants, key=lambda s: debut_au_plus_tard[s])
+            suite.append(courant)
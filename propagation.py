@@ -0,0 +1,317 @@
+from array import array
+from bisect import bisect_left
+from collections import deque
+from typing import TYPE_CHECKING, Dict, Iterable, List
+
+if TYPE_CHECKING:
+    from projet_csp.planification import PlanificateurCSP
+
+
+def niveaux_salles(planificateur: "PlanificateurCSP", examens: Iterable[str]):
+    """Niveaux de salle: indices dans la liste triée des capacités distinctes
+
+    Une salle assez grande pour un examen l'est pour tous les plus petits.
+    Renvoie (capacités distinctes, niveau de chaque examen, et pour chaque
+    créneau le nombre de salles disponibles de niveau >= k).
+    """
+    capacites = planificateur.capacites_salles
+    niveaux = sorted(set(capacites))
+    niveau_examen = {
+        e: bisect_left(niveaux, capacites[planificateur.salles_eligibles[e][0]])
+        for e in examens
+    }
+    salles_par_niveau = []
+    for salles in planificateur.salles_par_creneau:
+        par_niveau = [0] * (len(niveaux) + 1)
+        for salle in salles:
+            par_niveau[bisect_left(niveaux, capacites[salle])] += 1
+        for k in range(len(niveaux) - 1, -1, -1):
+            par_niveau[k] += par_niveau[k + 1]
+        salles_par_niveau.append(par_niveau)
+    return niveaux, niveau_examen, salles_par_niveau
+
+
+class _DomaineVide(Exception):
+    pass
+
+
+class Propagation:
+    """Propagation des contraintes sur les domaines de créneaux (AC-3)
+
+    Les examens dont le domaine change sont remis en file jusqu'au point
+    fixe; chaque passage applique:
+    - étudiants: un examen réduit à un créneau le retire à ses voisins du
+      graphe de conflits;
+    - enseignants: deux examens qui n'ont que le même enseignant possible ne
+      partagent jamais un créneau;
+    - salles: quand les examens déjà fixés dans un créneau occupent toutes
+      les salles disponibles de niveau >= k, le créneau est retiré aux
+      autres examens de niveau >= k (condition de Hall sur des ensembles
+      de salles emboîtés);
+    - prérequis: cohérence de bornes, un examen ne commence pas avant la fin
+      au plus tôt de ses prérequis ni ne finit après le début au plus tard
+      des examens qui en dépendent.
+    """
+
+    def __init__(self, planificateur: "PlanificateurCSP", domaines: Dict[str, List[int]] = None):
+        self.planificateur = planificateur
+        self.domaines = planificateur.domains if domaines is None else domaines
+        self.restants = {e: set(d) for e, d in self.domaines.items()}
+        self.bornes_creneaux = planificateur.bornes_creneaux
+
+        _, self.niveau_examen, self.salles_par_niveau = niveaux_salles(planificateur, self.restants)
+        self.candidats = {}  # creneau -> examens dont le domaine le contient
+        for examen, domaine in self.restants.items():
+            for creneau in domaine:
+                self.candidats.setdefault(creneau, set()).add(examen)
+
+        par_enseignant = {}
+        for examen in self.restants:
+            eligibles = planificateur.enseignants_eligibles[examen]
+            if len(eligibles) == 1:
+                par_enseignant.setdefault(eligibles[0], []).append(examen)
+        self.exclus = {}  # examen -> examens qui ne peuvent partager son créneau
+        for examen in self.restants:
+            exclus = {v for v in planificateur.graphe.voisins(examen) if v in self.restants}
+            eligibles = planificateur.enseignants_eligibles[examen]
+            if len(eligibles) == 1:
+                exclus.update(par_enseignant[eligibles[0]])
+                exclus.discard(examen)
+            self.exclus[examen] = exclus
+
+        self.successeurs = {e: [] for e in self.restants}
+        self.predecesseurs = {e: [] for e in self.restants}
+        for avant, apres in planificateur.prerequis:
+            if avant in self.restants and apres in self.restants:
+                self.successeurs[avant].append(apres)
+                self.predecesseurs[apres].append(avant)
+
+        self.fixes = set()
+        self.fixes_par_creneau = {}  # creneau -> nombre d'examens fixés par niveau
+        self.file = deque()
+        self.en_file = set()
+
+    def executer(self):
+        """Propage jusqu'au point fixe
+
+        Renvoie (domaines réduits, examen vidé): les domaines sont des
+        array("l") dans l'ordre d'origine; si un domaine devient vide, le
+        problème n'a pas de solution et cet examen est renvoyé (None sinon).
+        """
+        self.file.extend(self.restants)
+        self.en_file.update(self.restants)
+        try:
+            while self.file:
+                examen = self.file.popleft()
+                self.en_file.discard(examen)
+                self._reviser(examen)
+        except _DomaineVide as vide:
+            return None, vide.args[0]
+
+        reduits = {
+            e: array("l", (c for c in domaine if c in self.restants[e]))
+            for e, domaine in self.domaines.items()
+        }
+        return reduits, None
+
+    def _reviser(self, examen: str):
+        domaine = self.restants[examen]
+        if len(domaine) == 1 and examen not in self.fixes:
+            self.fixes.add(examen)
+            creneau = next(iter(domaine))
+            for autre in self.exclus[examen]:
+                self._retirer(autre, (creneau,))
+            self._fixer_salle(examen, creneau)
+
+        if self.successeurs[examen]:
+            limite = min(self._fin(c) for c in domaine)
+            for apres in self.successeurs[examen]:
+                self._retirer(apres, [c for c in self.restants[apres] if self._debut(c) < limite])
+        if self.predecesseurs[examen]:
+            limite = max(self._debut(c) for c in domaine)
+            for avant in self.predecesseurs[examen]:
+                self._retirer(avant, [c for c in self.restants[avant] if self._fin(c) > limite])
+
+    def _fixer_salle(self, examen: str, creneau: int):
+        """Compte l'examen fixé et sature le créneau pour les niveaux pleins"""
+        niveau = self.niveau_examen[examen]
+        salles = self.salles_par_niveau[creneau]
+        fixes = self.fixes_par_creneau.setdefault(creneau, [0] * (len(salles) - 1))
+        fixes[niveau] += 1
+        cumul = 0
+        for k in range(len(fixes) - 1, -1, -1):
+            cumul += fixes[k]
+            if k > niveau:
+                continue
+            if cumul > salles[k]:
+                raise _DomaineVide(examen)
+            if cumul == salles[k]:
+                for autre in list(self.candidats[creneau]):
+                    if autre not in self.fixes and self.niveau_examen[autre] >= k:
+                        self._retirer(autre, (creneau,))
+
+    def _retirer(self, examen: str, creneaux):
+        domaine = self.restants[examen]
+        avant = len(domaine)
+        for creneau in creneaux:
+            if creneau in domaine:
+                domaine.discard(creneau)
+                self.candidats[creneau].discard(examen)
+        if len(domaine) == avant:
+            return
+        if not domaine:
+            raise _DomaineVide(examen)
+        if examen not in self.en_file:
+            self.file.append(examen)
+            self.en_file.add(examen)
+
+    def _debut(self, creneau: int):
+        jour, heure_debut, _ = self.bornes_creneaux[creneau]
+        return jour, heure_debut
+
+    def _fin(self, creneau: int):
+        jour, _, heure_fin = self.bornes_creneaux[creneau]
+        return jour, heure_fin
+
+
+def propager(planificateur: "PlanificateurCSP", domaines: Dict[str, List[int]] = None):
+    """Réduit les domaines par propagation (voir Propagation); renvoie
+    (domaines réduits, examen vidé)"""
+    return Propagation(planificateur, domaines).executer()
+
+
+class PropagationRecherche:
+    """Propagation pendant la recherche, après chaque affectation
+
+    Complète la vérification en avant de SolveurHeuristique (voisins du
+    graphe de conflits, contraintes directes) sur les domaines du solveur:
+    - enseignants: le créneau affecté est retiré aux examens qui n'ont que
+      le même enseignant possible;
+    - salles: quand les examens affectés à un créneau occupent toutes les
+      salles disponibles de niveau >= k, le créneau est retiré aux examens
+      non affectés de niveau >= k (voir Propagation);
+    - prérequis: les bornes sont resserrées de proche en proche le long des
+      chaînes, jusqu'au point fixe, à partir de l'examen affecté et de ses
+      voisins réduits par la vérification en avant.
+
+    Chaque domaine réduit est empilé (`pushState`) une seule fois par
+    affectation et ajouté à `empiles`, que le solveur dépile au retour
+    arrière. `retraits` compte les valeurs retirées par la dernière recherche.
+    """
+
+    def __init__(self, planificateur: "PlanificateurCSP"):
+        examens = planificateur.variables
+        self.graphe = planificateur.graphe
+        self.bornes_creneaux = planificateur.bornes_creneaux
+        _, self.niveau_examen, self.salles_par_niveau = niveaux_salles(planificateur, examens)
+        self.par_niveau = {}  # niveau k -> examens de niveau >= k
+        for examen in examens:
+            for k in range(self.niveau_examen[examen] + 1):
+                self.par_niveau.setdefault(k, []).append(examen)
+        self.affectes_par_creneau = {}  # creneau -> nombre d'examens affectés par niveau
+
+        par_enseignant = {}
+        for examen in examens:
+            eligibles = planificateur.enseignants_eligibles[examen]
+            if len(eligibles) == 1:
+                par_enseignant.setdefault(eligibles[0], []).append(examen)
+        self.meme_enseignant = {}  # examen -> autres examens au seul même enseignant possible
+        for examens_enseignant in par_enseignant.values():
+            if len(examens_enseignant) > 1:
+                for examen in examens_enseignant:
+                    voisins = self.graphe.voisins(examen)
+                    self.meme_enseignant[examen] = [e for e in examens_enseignant
+                                                    if e != examen and e not in voisins]
+
+        self.successeurs = {}
+        self.predecesseurs = {}
+        for avant, apres in planificateur.prerequis:
+            self.successeurs.setdefault(avant, []).append(apres)
+            self.predecesseurs.setdefault(apres, []).append(avant)
+        self.lies = self.successeurs.keys() | self.predecesseurs.keys()
+        self.retraits = 0
+
+    def reinitialiser(self):
+        """Oublie les affectations, au début de chaque recherche"""
+        self.affectes_par_creneau = {}
+        self.retraits = 0
+
+    def affecter(self, examen: str, creneau: int):
+        niveaux = self.affectes_par_creneau.get(creneau)
+        if niveaux is None:
+            niveaux = self.affectes_par_creneau[creneau] = [0] * (len(self.salles_par_niveau[creneau]) - 1)
+        niveaux[self.niveau_examen[examen]] += 1
+
+    def desaffecter(self, examen: str, creneau: int):
+        self.affectes_par_creneau[creneau][self.niveau_examen[examen]] -= 1
+
+    def propager(self, examen: str, creneau: int, domains, assignments, empiles) -> bool:
+        """Réduit les domaines après l'affectation examen = creneau; faux si
+        un domaine devient vide"""
+        empiles_ids = {id(domaine) for domaine in empiles}
+
+        def retirer(autre, valeurs) -> bool:
+            domaine = domains[autre]
+            valeurs = [c for c in valeurs if c in domaine]
+            if not valeurs:
+                return True
+            if id(domaine) not in empiles_ids:
+                domaine.pushState()
+                empiles.append(domaine)
+                empiles_ids.add(id(domaine))
+            for valeur in valeurs:
+                domaine.hideValue(valeur)
+            self.retraits += len(valeurs)
+            if autre in lies and autre not in en_file:
+                file.append(autre)
+                en_file.add(autre)
+            return bool(domaine)
+
+        lies = self.lies
+        file = deque([examen])
+        file.extend(v for v in self.graphe.voisins(examen) if v in lies and v not in assignments)
+        en_file = set(file)
+
+        for autre in self.meme_enseignant.get(examen, ()):
+            if autre not in assignments and not retirer(autre, (creneau,)):
+                return False
+
+        # Plus petit niveau saturé du créneau (condition de Hall)
+        salles = self.salles_par_niveau[creneau]
+        affectes = self.affectes_par_creneau[creneau]
+        cumul, sature = 0, None
+        for k in range(len(affectes) - 1, -1, -1):
+            cumul += affectes[k]
+            if k <= self.niveau_examen[examen] and cumul == salles[k]:
+                sature = k
+        if sature is not None:
+            for autre in self.par_niveau[sature]:
+                if autre not in assignments and not retirer(autre, (creneau,)):
+                    return False
+
+        # Bornes des prérequis, jusqu'au point fixe
+        while file:
+            courant = file.popleft()
+            en_file.discard(courant)
+            valeurs = (assignments[courant],) if courant in assignments else domains[courant]
+            if courant in self.successeurs:
+                limite = min(self._fin(c) for c in valeurs)
+                for apres in self.successeurs[courant]:
+                    if apres not in assignments and not retirer(
+                            apres, [c for c in domains[apres] if self._debut(c) < limite]):
+                        return False
+            if courant in self.predecesseurs:
+                limite = max(self._debut(c) for c in valeurs)
+                for avant in self.predecesseurs[courant]:
+                    if avant not in assignments and not retirer(
+                            avant, [c for c in domains[avant] if self._fin(c) > limite]):
+                        return False
+        return True
+
+    def _debut(self, creneau: int):
+        jour, heure_debut, _ = self.bornes_creneaux[creneau]
+        return jour, heure_debut
+
+    def _fin(self, creneau: int):
+        jour, _, heure_fin = self.bornes_creneaux[creneau]
+        return jour, heure_fin
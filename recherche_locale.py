@@ -0,0 +1,280 @@
+import math
+import random
+import time
+from typing import TYPE_CHECKING, Dict, List
+
+from projet_csp.propagation import niveaux_salles
+
+if TYPE_CHECKING:
+    from projet_csp.objectif import ObjectifSouple
+    from projet_csp.planification import PlanificateurCSP
+
+
+class RechercheLocale:
+    """Recuit simulé sur les créneaux, avec mouvements simples et chaînes de Kempe
+
+    Le planning courant associe un créneau à chaque examen; salles et
+    surveillants sont attribués par couplage à la fin (voir
+    `PlanificateurCSP.completer_affectation`). Le coût compté est le nombre
+    de violations:
+    - paires d'examens en conflit d'étudiants dans le même créneau;
+    - prérequis non respectés;
+    - examens d'un créneau qui ne peuvent recevoir de salle ou de surveillant.
+
+    Tout est maintenu incrémentalement, sans réévaluer le planning:
+    - pour chaque examen, le nombre de voisins présents dans chaque créneau,
+      si bien qu'un déplacement coûte O(degré);
+    - pour chaque créneau, les effectifs par niveau de salle: une salle assez
+      grande pour un examen l'est pour tous les plus petits, le déficit de
+      salles se lit donc en O(niveaux);
+    - pour chaque créneau, un couplage maximum examen -> surveillant, réparé
+      par un chemin augmentant à chaque arrivée ou départ d'examen.
+
+    Avec un `objectif` (voir ObjectifSouple), la recherche continue une fois
+    les violations éliminées: les mouvements qui en recréent sont refusés et
+    le recuit porte alors sur le coût des préférences.
+    """
+
+    def __init__(self, planificateur: "PlanificateurCSP", graine: int = None,
+                 objectif: "ObjectifSouple" = None):
+        self.planificateur = planificateur
+        self.objectif = objectif
+        self.graphe = planificateur.graphe
+        self.hasard = random.Random(graine)
+        self.examens = list(planificateur.domains)
+        self.domaines = {e: list(d) for e, d in planificateur.domains.items()}
+        self.ensembles_domaines = {e: set(d) for e, d in self.domaines.items()}
+        self.voisins = {e: [v for v in self.graphe.voisins(e) if v in self.domaines] for e in self.examens}
+
+        # Niveaux de salle: indices dans la liste triée des capacités distinctes
+        self.niveaux, self.niveau_examen, self.salles_par_niveau = niveaux_salles(planificateur, self.examens)
+        self.enseignants_eligibles = planificateur.enseignants_eligibles
+
+        self.successeurs = {e: [] for e in self.examens}
+        self.predecesseurs = {e: [] for e in self.examens}
+        for avant, apres in planificateur.prerequis:
+            self.successeurs[avant].append(apres)
+            self.predecesseurs[apres].append(avant)
+
+        self.creneau = {}  # examen -> créneau courant
+        self.presents = {}  # examen -> nombre de voisins par créneau
+        nb_creneaux = len(planificateur.creneaux)
+        self.occupation = [0] * nb_creneaux
+        self.examens_par_niveau = [[0] * len(self.niveaux) for _ in range(nb_creneaux)]
+        self.surveillants = [{} for _ in range(nb_creneaux)]  # creneau -> {enseignant: examen}
+        self.surveillant_de = {}  # examen -> enseignant, s'il en a un
+        self.sans_surveillant = [set() for _ in range(nb_creneaux)]  # creneau -> examens
+        self.surnombre = [0] * nb_creneaux
+        self.violations = 0
+
+    def optimiser(self, temps_limite: float = 10.0, depart: Dict[str, int] = None,
+                  temperature: float = 2.0, refroidissement: float = 0.9995,
+                  arret=None, progression=None):
+        """Améliore le planning jusqu'à épuiser le temps, ou jusqu'à n'avoir plus
+        de violation quand il n'y a pas d'objectif
+
+        `arret` (optionnel, par exemple un threading.Event) interrompt la
+        recherche dès que `arret.is_set()` est vrai. `progression` (optionnel)
+        est appelé toutes les 256 itérations avec (itérations, meilleur nombre
+        de violations).
+
+        Renvoie (solution, nb_violations) pour le meilleur planning rencontré,
+        comparé d'abord sur les violations puis sur le coût de l'objectif.
+        """
+        debut = time.perf_counter()
+        self._initialiser(depart if depart is not None else self.planificateur.coloration_initiale())
+        meilleur_planning, meilleur = dict(self.creneau), self._cout()
+        temperature_initiale = temperature
+
+        iteration = 0
+        while self.examens and meilleur != (0, 0):
+            iteration += 1
+            if iteration % 256 == 0:
+                if progression is not None:
+                    progression(iteration, meilleur[0])
+                if time.perf_counter() - debut >= temps_limite or arret is not None and arret.is_set():
+                    break
+
+            examen = self._choisir_examen()
+            creneau = self.hasard.choice(self.domaines[examen])
+            if creneau == self.creneau[examen]:
+                continue
+
+            if self.hasard.random() < 0.5:
+                mouvements = self._chaine_kempe(examen, creneau)
+                if mouvements is None:
+                    continue
+            else:
+                mouvements = [(examen, creneau)]
+
+            avant = self._cout()
+            inverses = self._appliquer(mouvements)
+            apres = self._cout()
+            if avant[0] > 0:
+                delta = apres[0] - avant[0]
+            elif apres[0] > 0:
+                delta = math.inf  # ne jamais perdre la faisabilité
+            else:
+                delta = apres[1] - avant[1]
+            if delta > 0 and self.hasard.random() >= math.exp(-delta / temperature):
+                self._appliquer(inverses)
+            elif apres < meilleur:
+                if meilleur[0] > 0 and apres[0] == 0:
+                    temperature = temperature_initiale  # début de l'optimisation des préférences
+                meilleur_planning, meilleur = dict(self.creneau), apres
+
+            temperature = max(temperature * refroidissement, 0.05)
+
+        self.planificateur.instrumentation.compter("iterations_recuit", iteration)
+        solution, _ = self.planificateur.completer_affectation(meilleur_planning)
+        return solution, self._violations_exactes(meilleur_planning)
+
+    def _initialiser(self, depart: Dict[str, int]):
+        nb_creneaux = len(self.planificateur.creneaux)
+        for examen in self.examens:
+            creneau = depart.get(examen)
+            if creneau not in self.ensembles_domaines[examen]:
+                creneau = self.hasard.choice(self.domaines[examen])
+            self.creneau[examen] = creneau
+            self._compter(examen, creneau, +1)
+            self.presents[examen] = [0] * nb_creneaux
+        for examen in self.examens:
+            compteurs = self.presents[examen]
+            for voisin in self.voisins[examen]:
+                compteurs[self.creneau[voisin]] += 1
+
+        if self.objectif is not None:
+            self.objectif.initialiser(self.creneau)
+
+        conflits = sum(self.presents[e][self.creneau[e]] for e in self.examens) // 2
+        prerequis = sum(1 for avant, apres in self.planificateur.prerequis
+                        if not self.planificateur.creneau_precede(self.creneau[avant], self.creneau[apres]))
+        self.surnombre = [self._calculer_surnombre(c) for c in range(nb_creneaux)]
+        self.violations = conflits + prerequis + sum(self.surnombre)
+
+    def _cout(self) -> tuple:
+        """(violations, coût des préférences) du planning courant"""
+        return self.violations, self.objectif.cout if self.objectif is not None else 0
+
+    def _choisir_examen(self) -> str:
+        """Tire de préférence un examen en conflit"""
+        for _ in range(8):
+            examen = self.hasard.choice(self.examens)
+            if self.presents[examen][self.creneau[examen]]:
+                return examen
+        return examen
+
+    def _chaine_kempe(self, examen: str, creneau: int):
+        """Chaîne de Kempe de l'examen entre son créneau et `creneau`
+
+        Renvoie les déplacements qui échangent les deux créneaux dans la
+        composante connexe de l'examen, ou None si un examen de la chaîne ne
+        peut pas aller dans l'autre créneau.
+        """
+        origine = self.creneau[examen]
+        autre = {origine: creneau, creneau: origine}
+        mouvements = []
+        vus = {examen}
+        pile = [examen]
+        while pile:
+            courant = pile.pop()
+            cible = autre[self.creneau[courant]]
+            if cible not in self.ensembles_domaines[courant]:
+                return None
+            mouvements.append((courant, cible))
+            for voisin in self.voisins[courant]:
+                if voisin not in vus and self.creneau[voisin] == cible:
+                    vus.add(voisin)
+                    pile.append(voisin)
+        return mouvements
+
+    def _appliquer(self, mouvements: List[tuple]) -> List[tuple]:
+        """Applique les déplacements et renvoie ceux qui les annulent"""
+        inverses = []
+        for examen, creneau in mouvements:
+            inverses.append((examen, self.creneau[examen]))
+        for examen, creneau in mouvements:
+            self._deplacer(examen, creneau)
+        inverses.reverse()
+        return inverses
+
+    def _deplacer(self, examen: str, creneau: int):
+        """Déplace un examen en mettant à jour le coût en O(degré)"""
+        ancien = self.creneau[examen]
+        if ancien == creneau:
+            return
+        if self.objectif is not None:
+            self.objectif.deplacer(examen, creneau)
+        precede = self.planificateur.creneau_precede
+        delta = self.presents[examen][creneau] - self.presents[examen][ancien]
+        for apres in self.successeurs[examen]:
+            delta += (not precede(creneau, self.creneau[apres])) - (not precede(ancien, self.creneau[apres]))
+        for avant in self.predecesseurs[examen]:
+            delta += (not precede(self.creneau[avant], creneau)) - (not precede(self.creneau[avant], ancien))
+
+        for voisin in self.voisins[examen]:
+            compteurs = self.presents[voisin]
+            compteurs[ancien] -= 1
+            compteurs[creneau] += 1
+        self._compter(examen, ancien, -1)
+        self._compter(examen, creneau, +1)
+        self.creneau[examen] = creneau
+
+        for c in (ancien, creneau):
+            surnombre = self._calculer_surnombre(c)
+            delta += surnombre - self.surnombre[c]
+            self.surnombre[c] = surnombre
+        self.violations += delta
+
+    def _compter(self, examen: str, creneau: int, variation: int):
+        """Ajoute (+1) ou retire (-1) l'examen des effectifs du créneau"""
+        self.occupation[creneau] += variation
+        self.examens_par_niveau[creneau][self.niveau_examen[examen]] += variation
+        sans_surveillant = self.sans_surveillant[creneau]
+
+        if variation > 0:
+            if not self._augmenter(examen, creneau, set()):
+                sans_surveillant.add(examen)
+        elif examen in sans_surveillant:
+            sans_surveillant.discard(examen)
+        else:
+            del self.surveillants[creneau][self.surveillant_de.pop(examen)]
+            # Le surveillant libéré peut ouvrir un chemin augmentant
+            for attente in sans_surveillant:
+                if self._augmenter(attente, creneau, set()):
+                    sans_surveillant.discard(attente)
+                    break
+
+    def _augmenter(self, examen: str, creneau: int, visites: set) -> bool:
+        """Cherche un chemin augmentant pour donner un surveillant à l'examen"""
+        surveillants = self.surveillants[creneau]
+        for enseignant in self.enseignants_eligibles[examen]:
+            if enseignant in visites:
+                continue
+            visites.add(enseignant)
+            occupant = surveillants.get(enseignant)
+            if occupant is None or self._augmenter(occupant, creneau, visites):
+                surveillants[enseignant] = examen
+                self.surveillant_de[examen] = enseignant
+                return True
+        return False
+
+    def _calculer_surnombre(self, creneau: int) -> int:
+        """Examens du créneau qui ne peuvent recevoir de salle ou de surveillant"""
+        deficit_salles = 0
+        examens = 0
+        par_niveau = self.examens_par_niveau[creneau]
+        salles = self.salles_par_niveau[creneau]
+        for k in range(len(self.niveaux) - 1, -1, -1):
+            examens += par_niveau[k]
+            deficit_salles = max(deficit_salles, examens - salles[k])
+        return deficit_salles + len(self.sans_surveillant[creneau])
+
+    def _violations_exactes(self, planning: Dict[str, int]) -> int:
+        """Violations du planning avec les salles et surveillants réellement couplés"""
+        conflits = sum(1 for e1, e2, _ in self.graphe.aretes()
+                       if e1 in planning and e2 in planning and planning[e1] == planning[e2])
+        prerequis = sum(1 for avant, apres in self.planificateur.prerequis
+                        if not self.planificateur.creneau_precede(planning[avant], planning[apres]))
+        _, non_places = self.planificateur.completer_affectation(planning)
+        return conflits + prerequis + non_places
@@ -0,0 +1,229 @@
+import copy
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Dict, List, Set
+
+from projet_csp.appariement import en_premier, hopcroft_karp, meilleur_ajustement
+from projet_csp.heuristiques import Echeance
+from projet_csp.recherche_locale import RechercheLocale
+
+if TYPE_CHECKING:
+    from projet_csp.planification import ExamenCSP, PlanificateurCSP, SalleCSP
+
+
+@dataclass
+class Modifications:
+    """Changements apportés aux données d'une session déjà planifiée"""
+    salles_fermees: List[str] = field(default_factory=list)
+    disponibilites: Dict[str, List[tuple]] = field(default_factory=dict)  # salle -> nouvelles disponibilités
+    enseignants_indisponibles: List[str] = field(default_factory=list)
+    inscriptions: Dict[str, List[str]] = field(default_factory=dict)  # examen -> étudiants ajoutés
+    examens_ajoutes: List["ExamenCSP"] = field(default_factory=list)
+    examens_retires: List[str] = field(default_factory=list)
+
+    def appliquer(self, examens: List["ExamenCSP"], salles: List["SalleCSP"]) -> tuple:
+        """Renvoie (examens, salles) modifiés, sans toucher aux listes d'origine"""
+        fermees = set(self.salles_fermees)
+        nouvelles_salles = []
+        for salle in salles:
+            if salle.nom in fermees:
+                continue
+            salle = copy.copy(salle)
+            salle.disponibilites = list(self.disponibilites.get(salle.nom, salle.disponibilites))
+            nouvelles_salles.append(salle)
+
+        retires = set(self.examens_retires)
+        indisponibles = set(self.enseignants_indisponibles)
+        nouveaux_examens = []
+        for examen in list(examens) + list(self.examens_ajoutes):
+            if examen.nom in retires:
+                continue
+            examen = copy.copy(examen)
+            examen.enseignants = [e for e in examen.enseignants if e not in indisponibles]
+            ajouts = [e for e in self.inscriptions.get(examen.nom, []) if e not in examen.etudiants]
+            examen.etudiants = list(examen.etudiants) + ajouts
+            nouveaux_examens.append(examen)
+        return nouveaux_examens, nouvelles_salles
+
+
+def examens_touches(planificateur: "PlanificateurCSP", planning: Dict[str, int],
+                    preferences: Dict[str, tuple]) -> Set[str]:
+    """Examens du planning à déplacer pour qu'il redevienne valide
+
+    Pour chaque paire en conflit ou prérequis non respecté, un seul examen
+    est retenu; dans chaque créneau, ceux que le couplage ne peut doter d'une
+    salle ou d'un surveillant. Les examens absents du planning sont touchés.
+    """
+    graphe = planificateur.graphe
+    touches = {e for e in planificateur.variables if e not in planning}
+
+    for exam1, exam2, _ in graphe.aretes():
+        if exam1 in touches or exam2 in touches:
+            continue
+        if exam1 in planning and exam2 in planning and planning[exam1] == planning[exam2]:
+            # Le moins contraint des deux se replace le plus facilement
+            touches.add(min(exam1, exam2, key=lambda e: (graphe.degre(e), e)))
+
+    for avant, apres in planificateur.prerequis:
+        if avant in touches or apres in touches:
+            continue
+        if not planificateur.creneau_precede(planning[avant], planning[apres]):
+            touches.add(apres)
+
+    for creneau, examens in _par_creneau(planning, touches).items():
+        touches.update(_sans_ressource(planificateur, creneau, examens, preferences))
+    return touches
+
+
+def _par_creneau(planning: Dict[str, int], exclus: Set[str]) -> Dict[int, List[str]]:
+    """Examens du planning, hors `exclus`, regroupés par créneau"""
+    par_creneau = {}
+    for examen, creneau in planning.items():
+        if examen not in exclus:
+            par_creneau.setdefault(creneau, []).append(examen)
+    return par_creneau
+
+
+def _sans_ressource(planificateur: "PlanificateurCSP", creneau: int, examens: List[str],
+                    preferences: Dict[str, tuple]) -> List[str]:
+    """Examens d'un créneau que le couplage ne peut doter d'une salle ou
+    d'un surveillant"""
+    disponibles = planificateur.salles_par_creneau[creneau]
+    salles, enseignants = {}, {}
+    for examen in examens:
+        salle, enseignant = preferences.get(examen, (None, None))
+        eligibles = [s for s in planificateur.salles_eligibles[examen] if s in disponibles]
+        salles[examen] = en_premier(eligibles, salle)
+        enseignants[examen] = en_premier(planificateur.enseignants_eligibles[examen], enseignant)
+    couplage_salles = meilleur_ajustement(salles)
+    couplage_enseignants = hopcroft_karp(enseignants)
+    return [e for e in examens if e not in couplage_salles or e not in couplage_enseignants]
+
+
+def _elargir(planificateur: "PlanificateurCSP", planning: Dict[str, int], zone: Set[str],
+             preferences: Dict[str, tuple], tentative: int) -> Set[str]:
+    """Élargit la zone libre d'un cran
+
+    Aux tentatives paires, les examens liés à ceux de la zone: voisins dans
+    le graphe de conflits et examens reliés par un prérequis. Aux tentatives
+    impaires, les examens des créneaux surchargés, c'est-à-dire ceux où,
+    avec les examens de la zone remis à leur ancienne place, le couplage ne
+    dote plus chaque examen d'une salle et d'un surveillant; s'il n'y en a
+    aucun, on reprend les voisins.
+    """
+    elargie = set(zone)
+    if tentative % 2:
+        for creneau, examens in _par_creneau(planning, set()).items():
+            if _sans_ressource(planificateur, creneau, examens, preferences):
+                elargie.update(examens)
+        if len(elargie) > len(zone):
+            return elargie
+
+    for examen in zone:
+        elargie.update(v for v in planificateur.graphe.voisins(examen) if v in planificateur.domains)
+    for avant, apres in planificateur.prerequis:
+        if avant in zone or apres in zone:
+            elargie.update((avant, apres))
+    return elargie
+
+
+class ObjectifStabilite:
+    """Nombre d'examens placés hors de leur ancien créneau, comme objectif de
+    la recherche locale (même interface qu'ObjectifSouple)
+
+    Les examens sans ancien créneau ne comptent pas.
+    """
+
+    def __init__(self, planning: Dict[str, int]):
+        self.ancien = planning
+        self.creneau = {}
+        self.cout = 0
+
+    def initialiser(self, planning: Dict[str, int]) -> int:
+        """Prend `planning` ({examen: créneau}) comme état courant et renvoie son coût"""
+        self.creneau = dict(planning)
+        self.cout = sum(1 for e, c in self.creneau.items() if e in self.ancien and c != self.ancien[e])
+        return self.cout
+
+    def deplacer(self, examen: str, creneau: int):
+        """Passe `examen` dans `creneau` en mettant le coût à jour"""
+        if examen in self.ancien:
+            self.cout += (creneau != self.ancien[examen]) - (self.creneau[examen] != self.ancien[examen])
+        self.creneau[examen] = creneau
+
+
+def replanifier(planificateur: "PlanificateurCSP", ancienne_solution: Dict[str, tuple],
+                temps_limite: float = 10.0, rayon_max: int = 2):
+    """Répare un planning existant après modification des données
+
+    `planificateur` est construit sur les nouvelles données (voir
+    `Modifications.appliquer`); `ancienne_solution` est le planning publié,
+    décodé ({examen: (creneau, salle, enseignant)}, voir `decoder_solution`).
+
+    Seuls les examens touchés par les changements (voir `examens_touches`)
+    sont libres, tous les autres restent figés dans leur ancien créneau; le
+    retour arrière part de l'ancien créneau de chaque examen libre. Si la
+    zone libre ne suffit pas, elle est élargie d'un cran (voir `_elargir`:
+    voisins, puis examens des créneaux surchargés, en alternance), jusqu'à
+    `rayon_max` fois, puis à tout le planning, avant un dernier recours à la
+    recherche locale. Le retour arrière ne minimise pas le nombre de
+    déplacements: le planning trouvé est ensuite amélioré par la recherche
+    locale, sans perdre la faisabilité, avec pour objectif le nombre
+    d'examens déplacés (voir `ObjectifStabilite`). Salles et surveillants
+    publiés sont conservés autant que possible.
+
+    Renvoie (solution, nb_violations, examens déplacés).
+    """
+    debut = time.perf_counter()
+    indices = {tuple(creneau): c for c, creneau in enumerate(planificateur.creneaux)}
+    codes_salles = {nom: s for s, nom in enumerate(planificateur.noms_salles)}
+
+    planning, preferences = {}, {}
+    for examen, (creneau, salle, enseignant) in ancienne_solution.items():
+        c = indices.get(tuple(creneau))
+        if examen in planificateur.domains and c in planificateur.domains[examen]:
+            planning[examen] = c
+            preferences[examen] = (codes_salles.get(salle), planificateur.codes_enseignants.get(enseignant))
+
+    touches = examens_touches(planificateur, planning, preferences)
+    zone = set(touches)
+    print(f"Replanification: {len(zone)} examen(s) touché(s) sur {len(planificateur.variables)}")
+
+    solution = None
+    for tentative in range(rayon_max + 2):
+        restant = temps_limite - (time.perf_counter() - debut)
+        # Le temps restant est partagé entre les tentatives et le dernier recours
+        arret = Echeance(restant / (rayon_max + 3 - tentative))
+        figes = {e: [c] for e, c in planning.items() if e not in zone}
+        sous = planificateur.sous_probleme(planificateur.variables, planificateur.graphe.index_etudiants, figes)
+        trouvee = sous.resoudre(mode="first", ordre="dsatur", depart=planning, arret=arret)
+        if trouvee is not None:
+            nouveau = {e: planificateur.indice_creneau(code) for e, code in trouvee.items()}
+            if any(c != planning.get(e) for e, c in nouveau.items() if e not in touches):
+                # Le temps de cette tentative non consommé sert à ramener les
+                # examens déplacés sans y être obligés
+                stabilite = ObjectifStabilite(planning)
+                recherche = RechercheLocale(planificateur, objectif=stabilite)
+                restant = temps_limite - (time.perf_counter() - debut)
+                trouvee, _ = recherche.optimiser(restant, depart=nouveau, temperature=0.5, arret=arret)
+                nouveau = {e: planificateur.indice_creneau(code) for e, code in trouvee.items()}
+            gardes = {e: p for e, p in preferences.items() if nouveau.get(e) == planning[e]}
+            solution, _ = planificateur.completer_affectation(nouveau, gardes)
+            violations = 0
+            break
+        if len(zone) == len(planificateur.variables):
+            break
+        if tentative < rayon_max:
+            zone = _elargir(planificateur, planning, zone, preferences, tentative)
+        else:
+            zone = set(planificateur.variables)
+        print(f"Replanification: zone élargie à {len(zone)} examen(s)")
+
+    if solution is None:
+        restant = max(temps_limite - (time.perf_counter() - debut), 1.0)
+        recherche = RechercheLocale(planificateur, objectif=ObjectifStabilite(planning))
+        solution, violations = recherche.optimiser(restant, depart=planning, temperature=0.5)
+
+    deplaces = [e for e, code in solution.items() if planificateur.indice_creneau(code) != planning.get(e)]
+    print(f"Replanification: {len(deplaces)} examen(s) déplacé(s), {violations} violation(s)")
+    return solution, violations, deplaces
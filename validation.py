@@ -0,0 +1,250 @@
+"""Validation d'un planning, produit par le planificateur, importé ou modifié à la main
+
+Toutes les vérifications travaillent sur des tableaux NumPy d'entiers
+(codes des examens, salles, enseignants et étudiants, bornes en temps
+absolu): les chevauchements se détectent par tri par groupe, sans boucle
+Python sur les paires.
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+from projet_csp.planification import ExamenCSP, SalleCSP, bornes_creneau
+
+# Natures des violations, dans l'ordre du rapport
+NATURES = ("inconnu", "doublon", "absent", "manquant", "duree", "surveillant", "disponibilite",
+           "capacite", "salle", "enseignant", "etudiant", "prerequis")
+
+
+@dataclass
+class Violation:
+    """Une contrainte non respectée par le planning"""
+    nature: str  # voir NATURES
+    examens: Tuple[str, ...]
+    detail: str
+
+
+def _entier(ligne: Dict, champ: str) -> int:
+    try:
+        return int(ligne[champ])
+    except (TypeError, ValueError):
+        raise ValueError(f"{ligne['examen']}: {champ} invalide: {ligne.get(champ)!r}") from None
+
+
+def _chevauchements(groupes: np.ndarray, debuts: np.ndarray, fins: np.ndarray):
+    """Toutes les paires d'éléments d'un même groupe dont les intervalles se chevauchent
+
+    Après tri par (groupe, début), chaque élément est comparé à ceux qui
+    le suivent à distance 1, 2, ...: une passe vectorisée par distance,
+    jusqu'à ce qu'aucun élément ne commence avant le maximum cumulé des fins
+    qui le précèdent dans son groupe (décalé de façon que chaque groupe
+    reparte au-dessus du précédent). Renvoie (indices, indices) des paires.
+    """
+    ordre = np.lexsort((debuts, groupes))
+    groupes, debuts, fins = groupes[ordre], debuts[ordre], fins[ordre]
+    premiers, seconds = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    if len(groupes) < 2:
+        return premiers[0], seconds[0]
+
+    rangs = np.cumsum(np.concatenate(([0], groupes[1:] != groupes[:-1])))
+    base = debuts.min()
+    etendue = fins.max() - base + 1
+    debuts_decales = debuts - base + rangs * etendue
+    fins_cumulees = np.maximum.accumulate(fins - base + rangs * etendue)
+
+    distance = 1
+    while distance < len(groupes) and np.any(debuts_decales[distance:] < fins_cumulees[:-distance]):
+        paires = np.flatnonzero((groupes[distance:] == groupes[:-distance])
+                                & (debuts[distance:] < fins[:-distance]))
+        premiers.append(ordre[paires])
+        seconds.append(ordre[paires + distance])
+        distance += 1
+    return np.concatenate(premiers), np.concatenate(seconds)
+
+
+def _disponibles(salles: np.ndarray, jours: np.ndarray, debuts: np.ndarray, fins: np.ndarray,
+                 fenetres: List[tuple]) -> np.ndarray:
+    """Vrai pour chaque examen dont la salle est disponible pendant tout l'examen
+
+    `fenetres`: (salle, jour ou -1 pour tous les jours, début, fin), en heures
+    de la journée; les fenêtres de chaque salle sont parcourues ensemble, en
+    autant de passes que la salle qui en a le plus.
+    """
+    if not fenetres:
+        return np.zeros(len(salles), dtype=bool)
+    f_salles, f_jours, f_debuts, f_fins = (np.array(c, dtype=np.int64) for c in zip(*sorted(fenetres)))
+    bas = np.searchsorted(f_salles, salles, side="left")
+    haut = np.searchsorted(f_salles, salles, side="right")
+    disponibles = np.zeros(len(salles), dtype=bool)
+    for k in range(int((haut - bas).max(initial=0))):
+        indices = bas + k
+        valides = indices < haut
+        indices = np.minimum(indices, len(f_salles) - 1)
+        disponibles |= (valides
+                        & ((f_jours[indices] < 0) | (f_jours[indices] == jours))
+                        & (debuts >= f_debuts[indices]) & (fins <= f_fins[indices]))
+    return disponibles
+
+
+def valider_solution(lignes: Iterable[Dict], examens: Sequence[ExamenCSP], salles: Sequence[SalleCSP],
+                     prerequis: Sequence[tuple] = (),
+                     index_etudiants: Dict[str, List[str]] = None) -> List[Violation]:
+    """Toutes les violations d'un planning
+
+    `lignes`: une ligne par examen, comme `PlanificateurCSP.lignes_solution`
+    ou l'export JSON/CSV de la ligne de commande (examen, jour numéroté à
+    partir de 1 ou None, heure_debut, heure_fin, salle, enseignant). Les
+    étudiants sont lus dans `index_etudiants` (étudiant -> examens) s'il est
+    donné, sinon dans les examens.
+
+    Sont vérifiés: examens inconnus, en double ou absents, salle ou
+    surveillant manquant, durée du
+    créneau, surveillant autorisé, disponibilité et capacité de la salle,
+    salle ou enseignant occupés deux fois en même temps, étudiants ayant
+    deux examens simultanés (une violation par paire d'examens) et
+    prérequis. Renvoie la liste des violations, vide si le planning est
+    valide; lève ValueError si un jour ou une heure n'est pas un entier.
+    """
+    violations = []
+    codes_examens = {examen.nom: i for i, examen in enumerate(examens)}
+    codes_salles = {salle.nom: s for s, salle in enumerate(salles)}
+    noms_enseignants = list(dict.fromkeys(e for examen in examens for e in examen.enseignants))
+    codes_enseignants = {nom: t for t, nom in enumerate(noms_enseignants)}
+    nb_examens = len(examens)
+
+    # Planning codé: un indice par examen connu et planifié
+    planifies, jours, debuts, fins, codes_salle, codes_enseignant = [], [], [], [], [], []
+    vus = set()
+    for ligne in lignes:
+        nom = ligne["examen"]
+        code = codes_examens.get(nom)
+        if code is None:
+            violations.append(Violation("inconnu", (nom,), f"{nom}: examen inconnu"))
+            continue
+        if code in vus:
+            violations.append(Violation("doublon", (nom,), f"{nom}: planifié plusieurs fois"))
+            continue
+        vus.add(code)
+        salle, enseignant = ligne.get("salle") or None, ligne.get("enseignant") or None
+        if salle is None:
+            violations.append(Violation("manquant", (nom,), f"{nom}: salle manquante"))
+        elif salle not in codes_salles:
+            violations.append(Violation("inconnu", (nom,), f"{nom}: salle inconnue {salle}"))
+        if enseignant is None:
+            violations.append(Violation("manquant", (nom,), f"{nom}: surveillant manquant"))
+        elif enseignant not in codes_enseignants:
+            codes_enseignants[enseignant] = len(noms_enseignants)
+            noms_enseignants.append(enseignant)
+        planifies.append(code)
+        jours.append(_entier(ligne, "jour") - 1 if ligne.get("jour") not in (None, "") else 0)
+        debuts.append(_entier(ligne, "heure_debut"))
+        fins.append(_entier(ligne, "heure_fin"))
+        codes_salle.append(codes_salles.get(salle, -1))
+        codes_enseignant.append(codes_enseignants.get(enseignant, -1))
+
+    for examen in examens:
+        if codes_examens[examen.nom] not in vus:
+            violations.append(Violation("absent", (examen.nom,), f"{examen.nom}: absent du planning"))
+
+    planifies = np.array(planifies, dtype=np.int64)
+    jours = np.array(jours, dtype=np.int64)
+    debuts = np.array(debuts, dtype=np.int64)
+    fins = np.array(fins, dtype=np.int64)
+    codes_salle = np.array(codes_salle, dtype=np.int64)
+    codes_enseignant = np.array(codes_enseignant, dtype=np.int64)
+    noms = [examens[code].nom for code in planifies]
+
+    # Temps absolu: les journées se suivent sans se chevaucher
+    pas_jour = int(fins.max(initial=0)) + 1
+    debuts_absolus = jours * pas_jour + debuts
+    fins_absolues = jours * pas_jour + fins
+
+    durees = np.array([examens[code].duree for code in planifies], dtype=np.int64)
+    for i in np.flatnonzero(fins - debuts < durees):
+        violations.append(Violation("duree", (noms[i],), f"{noms[i]}: créneau de {fins[i] - debuts[i]}h "
+                                    f"pour une durée de {durees[i]}h"))
+
+    # Surveillant parmi les enseignants de l'examen: clés examen * nb + enseignant
+    nb_enseignants = max(len(noms_enseignants), 1)
+    autorises = np.fromiter((i * nb_enseignants + codes_enseignants[e]
+                             for i, examen in enumerate(examens) for e in examen.enseignants), dtype=np.int64)
+    affectes = np.flatnonzero(codes_enseignant >= 0)
+    for i in affectes[~np.isin(planifies[affectes] * nb_enseignants + codes_enseignant[affectes], autorises)]:
+        violations.append(Violation("surveillant", (noms[i],), f"{noms[i]}: "
+                                    f"{noms_enseignants[codes_enseignant[i]]} n'en est pas enseignant"))
+
+    # Salle disponible pendant tout l'examen
+    fenetres = []
+    for s, salle in enumerate(salles):
+        for dispo in salle.disponibilites:
+            jour, debut, fin = bornes_creneau(dispo)
+            fenetres.append((s, jour if len(dispo) == 3 else -1, debut, fin))
+    en_salle = np.flatnonzero(codes_salle >= 0)
+    disponibles = _disponibles(codes_salle[en_salle], jours[en_salle], debuts[en_salle], fins[en_salle], fenetres)
+    for i in en_salle[~disponibles]:
+        violations.append(Violation("disponibilite", (noms[i],), f"{noms[i]}: salle "
+                                    f"{salles[codes_salle[i]].nom} indisponible"))
+
+    # Étudiants inscrits: (étudiant, examen) codés
+    if index_etudiants is None:
+        index_etudiants = {}
+        for examen in examens:
+            for etudiant in examen.etudiants:
+                index_etudiants.setdefault(etudiant, []).append(examen.nom)
+    noms_etudiants = list(index_etudiants)
+    nb_inscriptions = sum(len(liste) for liste in index_etudiants.values())
+    inscrits_examen = np.fromiter((codes_examens.get(e, -1) for liste in index_etudiants.values() for e in liste),
+                                  dtype=np.int64, count=nb_inscriptions)
+    inscrits_etudiant = np.repeat(np.arange(len(noms_etudiants), dtype=np.int64),
+                                  [len(liste) for liste in index_etudiants.values()])
+
+    # Capacité
+    effectifs = np.bincount(inscrits_examen[inscrits_examen >= 0], minlength=nb_examens)[planifies]
+    capacites = np.array([salle.capacite for salle in salles] + [0], dtype=np.int64)[codes_salle]
+    for i in en_salle[effectifs[en_salle] > capacites[en_salle]]:
+        violations.append(Violation("capacite", (noms[i],), f"{noms[i]}: {effectifs[i]} étudiants pour "
+                                    f"{capacites[i]} places ({salles[codes_salle[i]].nom})"))
+
+    # Salles et enseignants occupés deux fois en même temps
+    for nature, codes, noms_ressources in (("salle", codes_salle, [s.nom for s in salles]),
+                                           ("enseignant", codes_enseignant, noms_enseignants)):
+        occupes = np.flatnonzero(codes >= 0)
+        premiers, seconds = _chevauchements(codes[occupes], debuts_absolus[occupes], fins_absolues[occupes])
+        for i, j in zip(occupes[premiers], occupes[seconds]):
+            violations.append(Violation(nature, (noms[i], noms[j]),
+                                        f"{noms_ressources[codes[i]]}: {noms[i]} et {noms[j]} en même temps"))
+
+    # Étudiants: une violation par paire d'examens, avec le nombre d'étudiants
+    position = np.full(nb_examens, -1, dtype=np.int64)
+    position[planifies] = np.arange(len(planifies))
+    places = position[np.where(inscrits_examen >= 0, inscrits_examen, 0)]
+    gardes = np.flatnonzero((inscrits_examen >= 0) & (places >= 0))
+    lignes_examens = places[gardes]
+    premiers, seconds = _chevauchements(inscrits_etudiant[gardes], debuts_absolus[lignes_examens],
+                                        fins_absolues[lignes_examens])
+    if len(premiers):
+        a, b = lignes_examens[premiers], lignes_examens[seconds]
+        a, b = np.minimum(a, b), np.maximum(a, b)
+        paires, representants, nombres = np.unique(a * len(planifies) + b, return_index=True, return_counts=True)
+        etudiants = inscrits_etudiant[gardes][premiers]
+        for paire, representant, nombre in zip(paires, representants, nombres):
+            i, j = divmod(int(paire), len(planifies))
+            violations.append(Violation("etudiant", (noms[i], noms[j]),
+                                        f"{noms[i]} et {noms[j]} en même temps pour {nombre} étudiant(s), "
+                                        f"dont {noms_etudiants[etudiants[representant]]}"))
+
+    # Prérequis: l'examen d'avant finit au plus tard quand l'autre commence
+    couples = [(position[codes_examens[avant]], position[codes_examens[apres]]) for avant, apres in prerequis
+               if avant in codes_examens and apres in codes_examens]
+    if couples:
+        avants, apres = (np.array(c, dtype=np.int64) for c in zip(*couples))
+        presents = (avants >= 0) & (apres >= 0)
+        avants, apres = avants[presents], apres[presents]
+        violes = fins_absolues[avants] > debuts_absolus[apres]
+        for i, j in zip(avants[violes], apres[violes]):
+            violations.append(Violation("prerequis", (noms[i], noms[j]), f"{noms[i]} doit précéder {noms[j]}"))
+
+    rang = {nature: k for k, nature in enumerate(NATURES)}
+    violations.sort(key=lambda v: rang[v.nature])
+    return violations